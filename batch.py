@@ -0,0 +1,118 @@
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from core import JobCancelled, _never_cancelled, _no_progress, extract_pages
+from ranges import range_label
+
+# Applies one operation to many files on a process pool. Each file is an
+# independent task: a failure is recorded in its result and the batch carries
+# on. Tasks only exchange file paths and small result dicts with the parent
+# process, so throughput scales with the number of cores.
+
+
+def default_workers():
+    # Respect CPU affinity (containers, taskset) where the platform exposes it
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def batch_output_path(input_file, page_range, output_dir=None):
+    # Same naming as the window's extract form
+    dir_path = output_dir or os.path.dirname(input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(dir_path, f"{base_name}_pages_{range_label(page_range)}.pdf")
+
+
+def _failed(input_file, error):
+    return {
+        "ok": False,
+        "operation": "extract",
+        "inputs": [os.path.abspath(input_file)],
+        "error": str(error),
+    }
+
+
+def _output_collisions(input_files, page_range, output_dir):
+    # Inputs whose output would land on the same path as another input's,
+    # e.g. a/scan.pdf and b/scan.pdf with one output folder, as
+    # {index: error}. None of them are run: whichever finished last would
+    # silently overwrite the others.
+    by_output = defaultdict(list)
+    for index, input_file in enumerate(input_files):
+        output_file = batch_output_path(input_file, page_range, output_dir)
+        by_output[os.path.normcase(os.path.abspath(output_file))].append(index)
+
+    collisions = {}
+    for output_file, indexes in by_output.items():
+        if len(indexes) > 1:
+            names = ", ".join(input_files[index] for index in indexes)
+            for index in indexes:
+                collisions[index] = (
+                    f"{output_file} would be written by each of {names}."
+                )
+    return collisions
+
+
+def _extract_one(input_file, page_range, output_dir):
+    # Runs in a worker process; never raises so one bad file can't stop the batch
+    try:
+        output_file = batch_output_path(input_file, page_range, output_dir)
+        return extract_pages(input_file, output_file, page_range, cached=False)
+    except Exception as e:
+        return _failed(input_file, e)
+
+
+def batch_extract(
+    input_files,
+    page_range,
+    output_dir=None,
+    workers=None,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+):
+    started = time.perf_counter()
+    workers = workers or default_workers()
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = [None] * len(input_files)
+    for index, error in _output_collisions(input_files, page_range, output_dir).items():
+        results[index] = _failed(input_files[index], error)
+    done = len(input_files) - results.count(None)
+
+    executor = ProcessPoolExecutor(max_workers=min(workers, len(input_files) or 1))
+    try:
+        futures = {
+            executor.submit(_extract_one, input_file, page_range, output_dir): index
+            for index, input_file in enumerate(input_files)
+            if results[index] is None
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as e:  # The worker process died
+                results[index] = _failed(input_files[index], e)
+            done += 1
+            progress(done, len(input_files))
+            if is_cancelled():
+                raise JobCancelled()
+    finally:
+        # On cancel, drop tasks that have not started yet
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    failed = sum(1 for result in results if not result["ok"])
+    elapsed = time.perf_counter() - started
+    return {
+        "ok": failed == 0,
+        "operation": "batch-extract",
+        "files": len(input_files),
+        "succeeded": len(input_files) - failed,
+        "failed": failed,
+        "workers": workers,
+        "elapsed": round(elapsed, 6),
+        "files_per_second": round(len(input_files) / elapsed, 1),
+        "results": results,
+    }
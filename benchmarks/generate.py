@@ -0,0 +1,211 @@
+import argparse
+import random
+import struct
+import zlib
+
+# Synthetic inputs for the benchmarks: PDFs with many pages, large images and
+# shared or repeated fonts, and PPTX decks with many slides. Output is
+# deterministic for a given seed, so runs on different machines time the same
+# documents.
+
+PAGE_SIZE = (612, 792)
+
+# ToUnicode map for the standard font, large enough that copying it matters
+_TO_UNICODE = b"\n".join(
+    [
+        b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap",
+        b"/CMapName /Synthetic def 1 begincodespacerange <00> <FF> endcodespacerange",
+        b"95 beginbfchar",
+    ]
+    + [b"<%02X> <%04X>" % (code, code) for code in range(32, 127)]
+    + [b"endbfchar endcmap CMapName currentdict /CMap defineresource pop end end"]
+)
+
+_WORDS = (
+    b"lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod "
+    b"tempor incididunt ut labore et dolore magna aliqua"
+).split()
+
+
+class _PdfBuilder:
+    def __init__(self, f):
+        self.f = f
+        self.offsets = {}
+        self.count = 0
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+
+    def reserve(self):
+        self.count += 1
+        return self.count
+
+    def write(self, number, body):
+        self.offsets[number] = self.f.tell()
+        self.f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def write_stream(self, number, entries, data):
+        self.write(
+            number,
+            b"<< %s /Length %d >>\nstream\n" % (entries, len(data))
+            + data
+            + b"\nendstream",
+        )
+
+    def close(self, root):
+        xref = self.f.tell()
+        self.f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (self.count + 1))
+        for number in range(1, self.count + 1):
+            self.f.write(b"%010d 00000 n \n" % self.offsets[number])
+        self.f.write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (self.count + 1, root, xref)
+        )
+
+
+def make_pdf(path, pages, image_kb=0, duplicate_fonts=False, seed=0):
+    # Every page shows text in Helvetica and, if image_kb is set, an image of
+    # about that many KB of incompressible (photo-like) data. Fonts are one
+    # shared object, or with duplicate_fonts an identical copy per page, as
+    # in documents assembled from separately produced files.
+    rng = random.Random(seed)
+    side = int((image_kb * 1024 / 3) ** 0.5) if image_kb else 0
+
+    with open(path, "wb") as f:
+        pdf = _PdfBuilder(f)
+        catalog, page_tree = pdf.reserve(), pdf.reserve()
+
+        def write_font():
+            to_unicode, font = pdf.reserve(), pdf.reserve()
+            pdf.write_stream(to_unicode, b"", _TO_UNICODE)
+            pdf.write(
+                font,
+                b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+                b"/Encoding /WinAnsiEncoding /ToUnicode %d 0 R >>" % to_unicode,
+            )
+            return font
+
+        shared_font = None if duplicate_fonts else write_font()
+        kids = []
+        for index in range(pages):
+            font = write_font() if duplicate_fonts else shared_font
+            resources = b"/Font << /F1 %d 0 R >>" % font
+            drawing = [b"BT /F1 24 Tf 72 720 Td (Page %d) Tj ET" % (index + 1)]
+
+            if side:
+                image = pdf.reserve()
+                pixels = rng.randbytes(side * side * 3)
+                pdf.write_stream(
+                    image,
+                    b"/Type /XObject /Subtype /Image /Width %d /Height %d "
+                    b"/ColorSpace /DeviceRGB /BitsPerComponent 8 "
+                    b"/Filter /FlateDecode" % (side, side),
+                    zlib.compress(pixels, 1),
+                )
+                resources += b" /XObject << /Im1 %d 0 R >>" % image
+                drawing.append(b"q 468 0 0 468 72 180 cm /Im1 Do Q")
+
+            for line in range(20):
+                words = b" ".join(rng.choice(_WORDS) for _ in range(10))
+                drawing.append(
+                    b"BT /F1 10 Tf 72 %d Td (%s) Tj ET" % (160 - line * 7, words)
+                )
+
+            contents, page = pdf.reserve(), pdf.reserve()
+            pdf.write_stream(
+                contents, b"/Filter /FlateDecode", zlib.compress(b"\n".join(drawing))
+            )
+            pdf.write(
+                page,
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %d %d] "
+                b"/Resources << %s >> /Contents %d 0 R >>"
+                % (page_tree, PAGE_SIZE[0], PAGE_SIZE[1], resources, contents),
+            )
+            kids.append(page)
+
+        pdf.write(
+            page_tree,
+            b"<< /Type /Pages /Kids [%s] /Count %d >>"
+            % (b" ".join(b"%d 0 R" % kid for kid in kids), len(kids)),
+        )
+        pdf.write(catalog, b"<< /Type /Catalog /Pages %d 0 R >>" % page_tree)
+        pdf.close(catalog)
+
+
+def _png(width, height, pixels):
+    def chunk(kind, data):
+        return (
+            struct.pack(">I", len(data))
+            + kind
+            + data
+            + struct.pack(">I", zlib.crc32(kind + data))
+        )
+
+    stride = width * 3
+    rows = b"".join(
+        b"\x00" + pixels[row * stride : (row + 1) * stride] for row in range(height)
+    )
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows, 1))
+        + chunk(b"IEND", b"")
+    )
+
+
+def make_pptx(path, slides, image_kb=0, notes=False, seed=0):
+    # A deck with a title and body text per slide and, if image_kb is set, a
+    # picture of about that many KB per slide
+    from io import BytesIO
+    from pptx import Presentation
+    from pptx.util import Inches
+
+    rng = random.Random(seed)
+    side = int((image_kb * 1024 / 3) ** 0.5) if image_kb else 0
+
+    presentation = Presentation()
+    layout = presentation.slide_layouts[1]
+    for index in range(slides):
+        slide = presentation.slides.add_slide(layout)
+        slide.shapes.title.text = f"Slide {index + 1}"
+        words = [rng.choice(_WORDS).decode() for _ in range(30)]
+        slide.placeholders[1].text = " ".join(words)
+        if side:
+            image = _png(side, side, rng.randbytes(side * side * 3))
+            slide.shapes.add_picture(BytesIO(image), Inches(5), Inches(4), Inches(3))
+        if notes:
+            slide.notes_slide.notes_text_frame.text = f"Notes for slide {index + 1}"
+    presentation.save(path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic inputs.")
+    subparsers = parser.add_subparsers(dest="kind", required=True)
+
+    pdf = subparsers.add_parser("pdf", help="generate a PDF")
+    pdf.add_argument("output")
+    pdf.add_argument("--pages", type=int, default=100)
+    pdf.add_argument("--image-kb", type=int, default=0, help="image size per page")
+    pdf.add_argument(
+        "--duplicate-fonts",
+        action="store_true",
+        help="an identical font object per page instead of one shared font",
+    )
+    pdf.add_argument("--seed", type=int, default=0)
+
+    pptx = subparsers.add_parser("pptx", help="generate a PPTX deck")
+    pptx.add_argument("output")
+    pptx.add_argument("--slides", type=int, default=50)
+    pptx.add_argument("--image-kb", type=int, default=0, help="image size per slide")
+    pptx.add_argument("--notes", action="store_true", help="add speaker notes")
+    pptx.add_argument("--seed", type=int, default=0)
+
+    args = parser.parse_args(argv)
+    if args.kind == "pdf":
+        make_pdf(
+            args.output, args.pages, args.image_kb, args.duplicate_fonts, args.seed
+        )
+    else:
+        make_pptx(args.output, args.slides, args.image_kb, args.notes, args.seed)
+
+
+if __name__ == "__main__":
+    main()
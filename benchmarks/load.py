@@ -0,0 +1,178 @@
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate import make_pdf  # noqa: E402
+
+# Load test for the HTTP service (splitter.py serve). Concurrent clients send
+# the same extract request over keep-alive connections; the run reports
+# throughput, latency percentiles, refused requests (503) and the server's
+# own /metrics at the end.
+#
+#   python benchmarks/load.py -c 16 -n 400          starts a server itself
+#   python benchmarks/load.py --url http://127.0.0.1:8080
+#
+# With fewer workers plus queue slots than clients, some requests are
+# refused: that is the backpressure working, not a failure.
+
+BOUNDARY = "splitter-load-test"
+SPLITTER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "splitter.py"
+)
+
+
+def multipart_body(path, pages):
+    with open(path, "rb") as f:
+        document = f.read()
+    return b"".join(
+        [
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="pages"\r\n\r\n'
+            f"{pages}\r\n"
+            f"--{BOUNDARY}\r\n"
+            'Content-Disposition: form-data; name="file"; filename="load.pdf"\r\n'
+            "Content-Type: application/pdf\r\n\r\n".encode(),
+            document,
+            f"\r\n--{BOUNDARY}--\r\n".encode(),
+        ]
+    )
+
+
+def start_server(workers, queue_size):
+    # A server on a free port; returns the process and its URL
+    command = [sys.executable, SPLITTER, "serve", "--port", "0"]
+    if workers:
+        command += ["--workers", str(workers)]
+    if queue_size is not None:
+        command += ["--queue-size", str(queue_size)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    ready = json.loads(process.stdout.readline())
+    return process, ready["url"]
+
+
+def client(url, body, count, latencies, statuses, lock):
+    parts = urlsplit(url)
+    connection = None
+    for _ in range(count):
+        if connection is None:
+            connection = http.client.HTTPConnection(parts.hostname, parts.port)
+        started = time.perf_counter()
+        try:
+            connection.request(
+                "POST",
+                "/extract",
+                body,
+                {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"},
+            )
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+            if response.will_close:
+                connection.close()
+                connection = None
+        except (ConnectionError, http.client.HTTPException):
+            status = "error"
+            connection.close()
+            connection = None
+        with lock:
+            latencies.append(time.perf_counter() - started)
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+    if connection is not None:
+        connection.close()
+
+
+def percentile(samples, fraction):
+    return round(samples[min(len(samples) - 1, int(len(samples) * fraction))], 6)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the splitter server.")
+    parser.add_argument("--url", help="server to test (default: start one)")
+    parser.add_argument(
+        "-c", "--clients", type=int, default=8, help="concurrent clients (default: 8)"
+    )
+    parser.add_argument(
+        "-n", "--requests", type=int, default=200, help="total requests (default: 200)"
+    )
+    parser.add_argument(
+        "--pages", type=int, default=50, help="pages in the test PDF (default: 50)"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, help="workers of the started server"
+    )
+    parser.add_argument(
+        "-q", "--queue-size", type=int, help="queue size of the started server"
+    )
+    args = parser.parse_args(argv)
+
+    process = None
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, "load.pdf")
+        make_pdf(path, args.pages)
+        body = multipart_body(path, f"1-{max(1, args.pages // 2)}")
+
+        url = args.url
+        if url is None:
+            process, url = start_server(args.workers, args.queue_size)
+        try:
+            latencies, statuses, lock = [], {}, threading.Lock()
+            per_client = [
+                args.requests // args.clients + (i < args.requests % args.clients)
+                for i in range(args.clients)
+            ]
+            threads = [
+                threading.Thread(
+                    target=client, args=(url, body, count, latencies, statuses, lock)
+                )
+                for count in per_client
+            ]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            parts = urlsplit(url)
+            connection = http.client.HTTPConnection(parts.hostname, parts.port)
+            connection.request("GET", "/metrics")
+            server_metrics = json.loads(connection.getresponse().read())
+            connection.close()
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+
+    latencies.sort()
+    results = {
+        "url": url,
+        "clients": args.clients,
+        "requests": len(latencies),
+        "elapsed": round(elapsed, 6),
+        "requests_per_second": round(statuses.get("200", 0) / elapsed, 1),
+        "statuses": statuses,
+        "p50": percentile(latencies, 0.5),
+        "p95": percentile(latencies, 0.95),
+        "p99": percentile(latencies, 0.99),
+        "server": server_metrics,
+    }
+    print(
+        f"{results['requests_per_second']:.1f} req/s, p50 {results['p50']:.3f} s, "
+        f"p99 {results['p99']:.3f} s, statuses {statuses}",
+        file=sys.stderr,
+    )
+    print(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.generate import make_pdf, make_pptx  # noqa: E402
+
+# Times extract, split, merge and slide extraction on synthetic inputs and
+# records wall time, pages per second and peak resident memory per case.
+# Every run happens in a fresh process, so nothing is cached between runs and
+# the peak memory belongs to that run alone (it includes the interpreter and
+# imports, about 30-40 MB).
+#
+#   python benchmarks/run.py -o baseline.json
+#   python benchmarks/run.py --compare baseline.json --threshold 0.2
+#
+# With --compare the exit code is 1 when any case got slower, or used more
+# memory, than the baseline by more than the threshold.
+
+RESULTS_VERSION = 1
+
+# name: (operation, inputs, arguments). Inputs are (kind, size, options);
+# sizes are multiplied by --scale. Arguments may use {size}, the input size,
+# and {half}.
+CASES = {
+    "extract-text": ("extract_pages", [("pdf", 2000, {})], ["1-{half}"]),
+    "extract-images": (
+        "extract_pages",
+        [("pdf", 100, {"image_kb": 1024})],
+        ["1-{half}"],
+    ),
+    "split": ("split_pages", [("pdf", 2000, {})], ["every 100 pages"]),
+    "merge-shared-fonts": ("merge_pdfs", [("pdf", 500, {})] * 4, []),
+    "merge-duplicate-fonts": (
+        "merge_pdfs",
+        [("pdf", 500, {"duplicate_fonts": True})] * 4,
+        [],
+    ),
+    "slides": (
+        "extract_slides",
+        [("pptx", 300, {"image_kb": 50, "notes": True})],
+        ["1-{half}"],
+    ),
+}
+
+
+def _input_path(workdir, kind, size, options, seed):
+    flags = "".join(f"_{key}-{value}" for key, value in sorted(options.items()))
+    return os.path.join(workdir, f"{kind}_{size}{flags}_{seed}.{kind}")
+
+
+def prepare_inputs(workdir, inputs, scale):
+    # Generated inputs are reused if they already exist in workdir
+    paths = []
+    for seed, (kind, size, options) in enumerate(inputs):
+        size = max(2, int(size * scale))
+        path = _input_path(workdir, kind, size, options, seed)
+        if not os.path.exists(path):
+            if kind == "pdf":
+                make_pdf(path, size, seed=seed, **options)
+            else:
+                make_pptx(path, size, seed=seed, **options)
+        paths.append(path)
+    return paths, size
+
+
+def _run_once(operation, input_paths, arguments, output_path):
+    # Runs in a fresh worker process
+    import core
+    from memory import peak_rss
+
+    job = getattr(core, operation)
+    started = time.perf_counter()
+    if operation == "merge_pdfs":
+        result = job(input_paths, output_path)
+    else:
+        result = job(input_paths[0], output_path, *arguments)
+    wall = time.perf_counter() - started
+    return {
+        "wall": wall,
+        "pages": result["pages"],
+        "output_bytes": result["output_bytes"],
+        "peak_rss": peak_rss(),
+    }
+
+
+def run_case(name, workdir, scale, repeat):
+    operation, inputs, arguments = CASES[name]
+    input_paths, size = prepare_inputs(workdir, inputs, scale)
+    arguments = [arg.format(size=size, half=max(1, size // 2)) for arg in arguments]
+    if operation == "split_pages":
+        output_path = os.path.join(workdir, f"{name}-output")
+        os.makedirs(output_path, exist_ok=True)
+    else:
+        extension = ".pptx" if operation == "extract_slides" else ".pdf"
+        output_path = os.path.join(workdir, f"{name}-output{extension}")
+
+    runs = []
+    for _ in range(repeat):
+        with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+            runs.append(
+                executor.submit(
+                    _run_once, operation, input_paths, arguments, output_path
+                ).result()
+            )
+
+    # The fastest run is the least disturbed by the rest of the machine
+    best = min(runs, key=lambda run: run["wall"])
+    return {
+        "operation": operation,
+        "input_bytes": sum(os.path.getsize(path) for path in input_paths),
+        "pages": best["pages"],
+        "wall": round(best["wall"], 6),
+        "pages_per_second": round(best["pages"] / best["wall"], 1),
+        "peak_rss": max(run["peak_rss"] for run in runs),
+        "output_bytes": best["output_bytes"],
+        "runs": [round(run["wall"], 6) for run in runs],
+    }
+
+
+def compare(results, baseline, threshold):
+    # Returns the regressions as messages. Cases missing from either side
+    # are skipped; scale must match or the numbers are not comparable.
+    if baseline.get("scale") != results["scale"]:
+        return [
+            f"baseline was recorded at scale {baseline.get('scale')}, "
+            f"this run at {results['scale']}"
+        ]
+    regressions = []
+    for name, case in results["cases"].items():
+        base = baseline.get("cases", {}).get(name)
+        if base is None:
+            continue
+        for metric in ("wall", "peak_rss"):
+            if case[metric] > base[metric] * (1 + threshold):
+                regressions.append(
+                    f"{name}: {metric} {case[metric]} vs {base[metric]} "
+                    f"(+{case[metric] / base[metric] - 1:.0%})"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the splitter benchmarks.")
+    parser.add_argument(
+        "-c",
+        "--case",
+        action="append",
+        choices=sorted(CASES),
+        help="run only this case (repeatable)",
+    )
+    parser.add_argument(
+        "--scale",
+        type=float,
+        default=1.0,
+        help="multiply input sizes by this factor (default: 1.0)",
+    )
+    parser.add_argument(
+        "-r", "--repeat", type=int, default=3, help="runs per case (default: 3)"
+    )
+    parser.add_argument(
+        "-w", "--workdir", help="keep generated inputs here and reuse them"
+    )
+    parser.add_argument("-o", "--output", help="write the results JSON here")
+    parser.add_argument("--compare", help="baseline results JSON to compare with")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="allowed slowdown against the baseline (default: 0.2 = 20%%)",
+    )
+    args = parser.parse_args(argv)
+
+    results = {
+        "version": RESULTS_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "scale": args.scale,
+        "repeat": args.repeat,
+        "cases": {},
+    }
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        workdir = args.workdir or tmpdir
+        os.makedirs(workdir, exist_ok=True)
+        for name in args.case or CASES:
+            case = run_case(name, workdir, args.scale, args.repeat)
+            results["cases"][name] = case
+            print(
+                f"{name:24} {case['wall']:9.3f} s {case['pages_per_second']:10.1f} "
+                f"pages/s {case['peak_rss'] / 2**20:8.1f} MB",
+                file=sys.stderr,
+            )
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# In-process cache of parsed documents, so trying several ranges on the same
+# file (or showing its page count when it is selected) parses it only once.
+# Entries are keyed by (path, size, mtime) and evicted least recently used
+# first once their estimated size exceeds the budget.
+
+CACHE_MAX_BYTES = int(os.environ.get("SPLITTER_CACHE_MB", "256")) * 1024 * 1024
+
+
+class _Entry:
+    def __init__(self, document, cost):
+        self.document = document
+        self.cost = cost
+        # Parsed documents are not thread-safe; one user at a time
+        self.lock = threading.Lock()
+
+
+class DocumentCache:
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self):
+        while self.total_bytes > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry.cost
+
+    def _insert(self, key, entry):
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None:
+                # Another thread loaded it first; share that one
+                return existing
+            # Drop entries for older versions of the same file
+            for stale in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self.total_bytes -= self._entries.pop(stale).cost
+            self._entries[key] = entry
+            self.total_bytes += entry.cost
+            self._evict()
+            return entry
+
+    @contextmanager
+    def open(self, path, kind, loader):
+        stat = os.stat(path)
+        key = (os.path.abspath(path), kind, stat.st_size, stat.st_mtime_ns)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+
+        if entry is None:
+            # The file size is a lower bound for the parsed document's memory
+            entry = _Entry(loader(path), stat.st_size)
+            if entry.cost <= self.max_bytes:
+                entry = self._insert(key, entry)
+
+        with entry.lock:
+            yield entry.document
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+
+document_cache = DocumentCache()
+
+
+def _load_pdf(path):
+    from PyPDF2 import PdfReader
+
+    return PdfReader(path)
+
+
+def _load_slide_list(path):
+    import pptx_package
+
+    with pptx_package.Package(path) as package:
+        return [slide.get("id") for slide in package.slide_ids()]
+
+
+def open_pdf(path):
+    return document_cache.open(path, "pdf", _load_pdf)
+
+
+def open_slide_list(path):
+    # Only presentation.xml is parsed; see pptx_package
+    return document_cache.open(path, "pptx", _load_slide_list)
+
+
+def page_count(path):
+    with open_pdf(path) as reader:
+        return len(reader.pages)
+
+
+def slide_count(path, cached=True):
+    if not cached:
+        return len(_load_slide_list(path))
+    with open_slide_list(path) as slides:
+        return len(slides)
@@ -0,0 +1,47 @@
+import json
+import os
+import sys
+
+# Per-user application data: small JSON state files such as the cached
+# update check. The folder is created on first use.
+#   Windows  %LOCALAPPDATA%\Splitter
+#   macOS    ~/Library/Application Support/Splitter
+#   Linux    $XDG_DATA_HOME/splitter (~/.local/share/splitter)
+# SPLITTER_DATA_DIR overrides the location.
+
+APP_NAME = "Splitter"
+
+
+def app_data_dir():
+    path = os.environ.get("SPLITTER_DATA_DIR")
+    if not path:
+        if sys.platform == "win32":
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            path = os.path.join(base, APP_NAME)
+        elif sys.platform == "darwin":
+            path = os.path.expanduser(f"~/Library/Application Support/{APP_NAME}")
+        else:
+            base = os.environ.get("XDG_DATA_HOME") or os.path.expanduser(
+                "~/.local/share"
+            )
+            path = os.path.join(base, APP_NAME.lower())
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_state(name, default=None):
+    # A missing or unreadable file gives the default
+    try:
+        with open(os.path.join(app_data_dir(), name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_state(name, data):
+    # Written to a temporary file and renamed, so readers never see half a file
+    path = os.path.join(app_data_dir(), name)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
@@ -0,0 +1,594 @@
+import glob
+import os
+import threading
+import time
+from contextlib import contextmanager
+from cache import open_pdf, slide_count
+from metrics import JobMetrics
+from ranges import PageSelection, RangeError, parse_selection, range_label
+from sinks import StagedOutputs, open_output, output_name
+
+# GUI-free implementation of the splitter operations. Nothing in this module
+# may import PyQt6: it backs both the desktop window and the command line.
+# PyPDF2 and lxml are imported inside the operations that need them so
+# importing this module stays cheap.
+
+# Progress for multi-file jobs is reported in fractions of a file
+PROGRESS_STEPS_PER_FILE = 1000
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobError(Exception):
+    pass
+
+
+def _no_progress(done, total):
+    pass
+
+
+def _never_cancelled():
+    return False
+
+
+def _make_result(operation, input_files, output_file, pages, started, output_bytes):
+    elapsed = time.perf_counter() - started
+    return {
+        "ok": True,
+        "operation": operation,
+        "inputs": [os.path.abspath(path) for path in input_files],
+        "output": output_name(output_file),
+        "pages": pages,
+        "output_bytes": output_bytes,
+        "elapsed": round(elapsed, 6),
+    }
+
+
+def expand_inputs(patterns, directory_pattern="*.pdf"):
+    # Expand glob patterns and directories in order (the shell does not do it
+    # on Windows). Matches of one pattern are sorted; files are kept as given.
+    input_files = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            input_files.extend(
+                sorted(glob.glob(os.path.join(pattern, directory_pattern)))
+            )
+        elif glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise JobError(f"No files match {pattern!r}.")
+            input_files.extend(matches)
+        else:
+            input_files.append(pattern)
+    return input_files
+
+
+def read_input_list(list_file):
+    # One path per line; blank lines and lines starting with # are ignored
+    with open(list_file, encoding="utf-8") as f:
+        lines = [line.strip() for line in f]
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def parse_pages(page_range, total_pages, item="page", document="PDF"):
+    # Pages in the order given, as a ranges.PageSelection (see ranges for the
+    # syntax); duplicates are kept
+    try:
+        return parse_selection(page_range, total_pages, item, document)
+    except RangeError as e:
+        raise JobError(str(e))
+
+
+def is_split_spec(page_range):
+    spec = page_range.strip().lower()
+    return ";" in spec or spec.startswith("every") or spec == "burst"
+
+
+def parse_split_spec(spec, total_pages, reader=None, guard=None, optimize=True):
+    # "1-10;11-20;21-30" gives one output per range; "every 50 pages" cuts the
+    # document into 50-page chunks, "every page" (or "burst") into single
+    # pages, and "every 10 MB" into chunks of at most 10 MB, estimated from
+    # the source for output written with or without optimize (needs the
+    # reader, see sizing). Returns (label, pages) per output, where label is
+    # the range as used in the output file name.
+    words = spec.strip().lower().split()
+    if words in (["burst"], ["every", "page"]):
+        return [
+            (str(index + 1), PageSelection([range(index, index + 1)]))
+            for index in range(total_pages)
+        ]
+    if words and words[0] == "every" and words[-1].endswith("b"):
+        from sizing import parse_size, size_chunks
+
+        max_bytes = parse_size("".join(words[1:]))
+        if max_bytes is None:
+            raise JobError(f'Invalid split: {spec!r}. Use e.g. "every 10 MB".')
+        return size_chunks(reader, max_bytes, guard, optimize)
+    if words and words[0] == "every":
+        if (
+            len(words) not in (2, 3)
+            or words[2:] not in ([], ["page"], ["pages"])
+            or not words[1].isdigit()
+            or int(words[1]) < 1
+        ):
+            raise JobError(
+                f'Invalid split: {spec!r}. Use e.g. "every 50 pages", '
+                '"every page" or "every 10 MB".'
+            )
+        size = int(words[1])
+        return [
+            (
+                f"{start + 1}-{min(start + size, total_pages)}",
+                PageSelection([range(start, min(start + size, total_pages))]),
+            )
+            for start in range(0, total_pages, size)
+        ]
+
+    groups = []
+    for part in spec.split(";"):
+        if part.strip():
+            label = range_label(part)
+            groups.append((label, parse_pages(part, total_pages)))
+    if not groups:
+        raise JobError(f"Invalid split: {spec!r}.")
+    return groups
+
+
+def split_output_path(input_file, label, output_dir=None):
+    # Same naming as the window's extract form
+    dir_path = output_dir or os.path.dirname(input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(dir_path, f"{base_name}_pages_{label}.pdf")
+
+
+@contextmanager
+def _open_input_pdf(input_file, large_file, memory_limit, cached=True):
+    # Yields (reader, guard). Large-file mode maps the file instead of
+    # reading it into memory, skips the document cache, and releases parsed
+    # objects after every page (see memory.MemoryGuard). A memory limit
+    # implies large-file mode.
+    if not large_file and memory_limit is None:
+        if cached:
+            with open_pdf(input_file) as reader:
+                yield reader, None
+        else:
+            from PyPDF2 import PdfReader
+
+            yield PdfReader(input_file), None
+        return
+
+    from memory import MemoryGuard, open_mapped_pdf
+
+    with open_mapped_pdf(input_file) as reader:
+        yield reader, MemoryGuard(reader, memory_limit)
+
+
+def _add_memory_stats(result, guard):
+    if guard is not None:
+        from memory import peak_rss
+
+        result["peak_rss"] = peak_rss()
+    return result
+
+
+def _add_output_stats(result, writers):
+    # Size savings from deduplication and object streams (see pdf_stream)
+    result["bytes_saved"] = sum(writer.bytes_saved for writer in writers)
+    result["objects_deduplicated"] = sum(
+        writer.objects_deduplicated for writer in writers
+    )
+    return result
+
+
+@contextmanager
+def _image_recompressor(image_dpi, image_quality):
+    # Shared by all outputs of a job, so each image is recompressed once
+    if image_dpi is None:
+        yield None
+        return
+    if image_dpi <= 0:
+        raise JobError("Image resolution must be a positive number of dpi.")
+    if image_quality is not None and not 1 <= image_quality <= 95:
+        raise JobError("JPEG quality must be between 1 and 95.")
+
+    from recompress import DEFAULT_QUALITY, ImageRecompressor
+
+    with ImageRecompressor(image_dpi, image_quality or DEFAULT_QUALITY) as images:
+        yield images
+
+
+def _add_image_stats(result, images, metrics):
+    if images is not None:
+        result["images_recompressed"] = images.metrics.counters["images_recompressed"]
+        result["image_bytes_saved"] = images.metrics.counters["image_bytes_saved"]
+        result["images_per_second"] = images.images_per_second
+        metrics.absorb(images.metrics, within="copy")
+    return result
+
+
+def _write_pages(
+    reader,
+    pages,
+    output_file,
+    lock,
+    on_page,
+    is_cancelled,
+    optimize,
+    guard=None,
+    images=None,
+    staged=None,
+):
+    from pdf_stream import StreamingPdfWriter
+
+    # Pages are written as they are copied; the output only appears under
+    # its name once complete (see sinks)
+    with open_output(output_file, staged=staged) as output:
+        writer = StreamingPdfWriter(output, optimize, images)
+        source = writer.open_source(reader, pages, lock, guard)
+
+        def page_done():
+            if guard is not None:
+                with source.lock:
+                    guard.after_page()
+            on_page()
+            if is_cancelled():
+                raise JobCancelled()
+
+        # Contiguous runs are copied as a whole, each under its own page
+        # tree node
+        for run in pages.runs:
+            if is_cancelled():
+                raise JobCancelled()
+            writer.add_run(source, run, page_done)
+        writer.close()
+    return writer
+
+
+def extract_pages(
+    input_file,
+    output_file,
+    page_range,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    optimize=True,
+    large_file=False,
+    memory_limit=None,
+    image_dpi=None,
+    image_quality=None,
+    cached=True,
+):
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Repeated jobs on the same file reuse the parsed reader; one-shot
+    # workers (batch, watch, server) pass cached=False
+    with _open_input_pdf(input_file, large_file, memory_limit, cached) as (
+        reader,
+        guard,
+    ), _image_recompressor(image_dpi, image_quality) as images:
+        total_pages = len(reader.pages)
+        metrics.lap("open")
+        pages = parse_pages(page_range, total_pages)
+        metrics.lap("select")
+
+        # Add pages, checking for cancellation between pages
+        done = iter(range(1, len(pages) + 1))
+        writer = _write_pages(
+            reader,
+            pages,
+            output_file,
+            None,
+            lambda: progress(next(done), len(pages)),
+            is_cancelled,
+            optimize,
+            guard,
+            images,
+        )
+        metrics.lap("copy")
+        metrics.absorb(writer.metrics, within="copy")
+
+    result = _make_result(
+        "extract", [input_file], output_file, len(pages), started, writer.position
+    )
+    _add_image_stats(result, images, metrics)
+    _add_memory_stats(result, guard)
+    return metrics.finish(_add_output_stats(result, [writer]))
+
+
+def split_pages(
+    input_file,
+    output_dir,
+    spec,
+    workers=1,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    optimize=True,
+    large_file=False,
+    memory_limit=None,
+    image_dpi=None,
+    image_quality=None,
+):
+    from concurrent.futures import ThreadPoolExecutor
+
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Parse the source once; every output copies from this one reader
+    with _open_input_pdf(input_file, large_file, memory_limit) as (
+        reader,
+        guard,
+    ), _image_recompressor(image_dpi, image_quality) as images:
+        source_pages = len(reader.pages)
+        metrics.lap("open")
+        groups = parse_split_spec(spec, source_pages, reader, guard, optimize)
+        metrics.lap("select")
+        outputs = [
+            split_output_path(input_file, label, output_dir) for label, _ in groups
+        ]
+        total_pages = sum(len(pages) for _, pages in groups)
+
+        lock = threading.Lock() if workers > 1 else None
+        progress_lock = threading.Lock()
+        done = [0]
+
+        def on_page():
+            with progress_lock:
+                done[0] += 1
+                progress(done[0], total_pages)
+
+        writers = [None] * len(groups)
+
+        def write(index):
+            writers[index] = _write_pages(
+                reader,
+                groups[index][1],
+                outputs[index],
+                lock,
+                on_page,
+                is_cancelled,
+                optimize,
+                guard,
+                images,
+                staged,
+            )
+
+        # Outputs stay under temporary names until all of them are written
+        staged = StagedOutputs()
+        try:
+            if workers > 1:
+                # Object lookups are serialized on the shared reader;
+                # serializing and writing the outputs overlap
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    futures = [executor.submit(write, i) for i in range(len(groups))]
+                    for future in futures:
+                        future.result()
+            else:
+                for index in range(len(groups)):
+                    write(index)
+        except BaseException:
+            # All or nothing: drop the completed outputs, leaving any files
+            # already at the output paths as they were
+            staged.discard()
+            raise
+        staged.publish()
+        # With several workers the writers' stages overlap and add up to
+        # more than the elapsed time
+        metrics.lap("copy")
+        for writer in writers:
+            metrics.absorb(writer.metrics, within="copy")
+
+    output_bytes = sum(writer.position for writer in writers)
+    result = _make_result(
+        "split", [input_file], outputs[0], total_pages, started, output_bytes
+    )
+    result["outputs"] = [os.path.abspath(path) for path in outputs]
+    _add_image_stats(result, images, metrics)
+    _add_memory_stats(result, guard)
+    return metrics.finish(_add_output_stats(result, writers))
+
+
+def _copy_inputs(
+    writer, input_files, progress, is_cancelled, large_file, memory_limit, metrics
+):
+    # Copies every page of every input to the writer; returns the last
+    # input's memory guard, if any
+    total_steps = len(input_files) * PROGRESS_STEPS_PER_FILE
+    guard = None
+
+    # Inputs are opened one at a time and released before the next,
+    # so peak memory depends on the largest input, not on how many
+    # inputs there are
+    for file_index, input_file in enumerate(input_files):
+        opened = _open_input_pdf(input_file, large_file, memory_limit, cached=False)
+        with opened as (reader, guard):
+            page_count = len(reader.pages)
+            metrics.lap("open")
+            source = writer.open_source(reader, range(page_count), None, guard)
+            done = iter(range(1, page_count + 1))
+
+            def page_done():
+                if guard is not None:
+                    guard.after_page()
+                progress(
+                    file_index * PROGRESS_STEPS_PER_FILE
+                    + next(done) * PROGRESS_STEPS_PER_FILE // page_count,
+                    total_steps,
+                )
+                if is_cancelled():
+                    raise JobCancelled()
+
+            if is_cancelled():
+                raise JobCancelled()
+            writer.add_run(source, range(page_count), page_done)
+            metrics.lap("copy")
+
+            del source, reader
+    return guard
+
+
+def merge_pdfs(
+    input_files,
+    output_file,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    optimize=True,
+    large_file=False,
+    memory_limit=None,
+    image_dpi=None,
+    image_quality=None,
+):
+    if len(input_files) < 2:
+        raise JobError("Please select at least two PDF files to merge.")
+
+    from pdf_stream import StreamingPdfWriter
+
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Pages are written as they are copied; the output only appears under its
+    # name once complete (see sinks)
+    with _image_recompressor(image_dpi, image_quality) as images, open_output(
+        output_file
+    ) as output:
+        writer = StreamingPdfWriter(output, optimize, images)
+
+        guard = _copy_inputs(
+            writer,
+            input_files,
+            progress,
+            is_cancelled,
+            large_file,
+            memory_limit,
+            metrics,
+        )
+        writer.close()
+    metrics.lap("copy")
+    metrics.absorb(writer.metrics, within="copy")
+
+    result = _make_result(
+        "merge", input_files, output_file, writer.page_count, started, writer.position
+    )
+    result["pages_per_second"] = round(writer.page_count / result["elapsed"], 1)
+    _add_image_stats(result, images, metrics)
+    _add_memory_stats(result, guard)
+    return metrics.finish(_add_output_stats(result, [writer]))
+
+
+def append_pdfs(
+    target_file,
+    input_files,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    optimize=True,
+    large_file=False,
+    memory_limit=None,
+    image_dpi=None,
+    image_quality=None,
+):
+    if not input_files:
+        raise JobError("Please select the PDF files to append.")
+
+    from incremental import IncrementalPdfWriter, UpdateTarget
+    from sinks import open_append
+
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Only the trailer and page tree root of the target are read, and the
+    # pages are written after its end as an incremental update
+    target = UpdateTarget(target_file)
+    metrics.lap("open")
+    with _image_recompressor(image_dpi, image_quality) as images, open_append(
+        target_file, target.file_size
+    ) as output:
+        writer = IncrementalPdfWriter(output, target, optimize, images)
+        guard = _copy_inputs(
+            writer,
+            input_files,
+            progress,
+            is_cancelled,
+            large_file,
+            memory_limit,
+            metrics,
+        )
+        writer.close()
+    metrics.lap("copy")
+    metrics.absorb(writer.metrics, within="copy")
+
+    result = _make_result(
+        "append",
+        input_files,
+        target_file,
+        writer.page_count,
+        started,
+        writer.bytes_appended,
+    )
+    result["total_pages"] = target.page_count + writer.page_count
+    result["file_bytes"] = writer.position
+    result["pages_per_second"] = round(writer.page_count / result["elapsed"], 1)
+    _add_image_stats(result, images, metrics)
+    _add_memory_stats(result, guard)
+    return metrics.finish(_add_output_stats(result, [writer]))
+
+
+def extract_slides(
+    input_file,
+    output_file,
+    slide_range,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    cached=True,
+):
+    import pptx_package
+
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Count slides on the cached slide list
+    total_slides = slide_count(input_file, cached)
+    metrics.lap("open")
+
+    # Parse slide range
+    slides_to_extract = list(
+        parse_pages(slide_range, total_slides, "slide", "Presentation")
+    )
+    metrics.lap("select")
+
+    # Rewrite the package at zip level, copying kept parts unchanged
+    extracted = pptx_package.extract_slides(
+        input_file, output_file, slides_to_extract, progress, is_cancelled, metrics
+    )
+
+    output_bytes = metrics.counters["bytes_written"]
+    result = _make_result(
+        "slides", [input_file], output_file, extracted, started, output_bytes
+    )
+    return metrics.finish(result)
+
+
+def merge_presentations(
+    input_files,
+    output_file,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+):
+    if len(input_files) < 2:
+        raise JobError("Please select at least two presentations to merge.")
+
+    import pptx_merge
+
+    started = time.perf_counter()
+    metrics = JobMetrics()
+
+    # Parts are copied at zip level; shared media and masters only once
+    merged = pptx_merge.merge_decks(
+        input_files, output_file, progress, is_cancelled, metrics
+    )
+
+    output_bytes = metrics.counters["bytes_written"]
+    result = _make_result(
+        "merge-slides", input_files, output_file, merged, started, output_bytes
+    )
+    return metrics.finish(result)
@@ -0,0 +1,253 @@
+import re
+import zlib
+from core import JobError
+from pdf_stream import StreamingPdfWriter, _encode
+
+# Appending pages to an existing PDF as an incremental update: the copied
+# pages, a new version of the page tree root and an xref section listing just
+# those objects are written after the end of the file, with /Prev pointing at
+# the previous xref section. Nothing already in the file is rewritten, and
+# only its trailer, catalog and page tree root are read, so an append to a
+# 500 MB archive costs about the same as to a 5 MB one.
+#
+# Numbers below the file's /Size belong to its existing objects; the update
+# numbers its objects from /Size on. Deduplication only sees the appended
+# objects: matching them against the archive would mean reading it.
+
+# Attributes pages inherit from the page tree; the appended pages must not
+# pick up the archive's values for them
+INHERITABLE = ("/Resources", "/MediaBox", "/CropBox", "/Rotate")
+
+# What a page without an inherited attribute would have had in its own file
+NEUTRAL = {b"/Resources": b"<< >>", b"/Rotate": b"0", b"/MediaBox": b"[0 0 612 792]"}
+
+# Bytes read from the end of the file to find startxref
+TAIL_SIZE = 1024
+
+# Entry for an existing object the update leaves as it is
+UNCHANGED = object()
+
+
+class UpdateTarget:
+    # What an append needs from the existing file, read up front so the file
+    # can be closed before it is written to
+    def __init__(self, path):
+        from memory import open_mapped_pdf
+
+        with open_mapped_pdf(path) as reader:
+            trailer = reader.trailer
+            if "/Encrypt" in trailer:
+                raise JobError("Can't append to an encrypted PDF.")
+            mapped = reader.stream
+            self.file_size = len(mapped)
+            self.ends_with_newline = mapped[-1:] in (b"\n", b"\r")
+            self.startxref, self.xref_stream = _last_xref(mapped)
+
+            # PyPDF2 leaves /Size out of the trailer it builds from an xref
+            # stream; one past the highest number in use is as good
+            numbers = [n for objects in reader.xref.values() for n in objects]
+            numbers.extend(reader.xref_objStm)
+            self.size = max(int(trailer.get("/Size", 0)), max(numbers, default=0) + 1)
+            self.root = _encode(trailer.raw_get("/Root"))
+            self.info = (
+                _encode(trailer.raw_get("/Info")) if "/Info" in trailer else None
+            )
+            self.id = _encode(trailer["/ID"]) if "/ID" in trailer else None
+
+            pages_ref = trailer["/Root"].raw_get("/Pages")
+            pages = pages_ref.get_object()
+            if "/Kids" not in pages:
+                raise JobError("The PDF to append to has no page tree.")
+            self.pages_number = pages_ref.idnum
+            self.pages_generation = pages_ref.generation
+            # The root's own entries, written again unchanged
+            self.pages_entries = [
+                (_encode(key), _encode(value))
+                for key, value in pages.items()
+                if key not in ("/Kids", "/Count", "/Parent")
+            ]
+            self.kids = [_encode(kid) for kid in pages["/Kids"]]
+            self.page_count = int(pages["/Count"])
+            self.inherited = [key for key in INHERITABLE if key in pages]
+
+
+def _last_xref(mapped):
+    # (offset of the last xref section, whether it is an xref stream)
+    tail = mapped[max(0, len(mapped) - TAIL_SIZE) :]
+    matches = re.findall(rb"startxref\s+(\d+)", tail)
+    if not matches:
+        raise JobError("The PDF to append to has no startxref.")
+    offset = int(matches[-1])
+    return offset, mapped[offset : offset + 4] != b"xref"
+
+
+class IncrementalPdfWriter(StreamingPdfWriter):
+    def __init__(self, stream, target, optimize=True, images=None):
+        self.target = target
+        # Object streams need an xref stream, and an xref stream can only
+        # follow another one: a table-based file would stay readable by
+        # pre-1.5 readers everywhere except in the appended pages
+        super().__init__(stream, optimize and target.xref_stream, images)
+
+    def _start(self):
+        target = self.target
+        self.position = target.file_size
+        self.plain_bytes = 0
+        if not target.ends_with_newline:
+            self._write(b"\n")
+        self.offsets = [0] + [UNCHANGED] * (target.size - 1)
+        # Written again in close() with the new pages added
+        self.pages_ref = target.pages_number
+        self.offsets[self.pages_ref] = None
+
+    @property
+    def bytes_appended(self):
+        return self.position - self.target.file_size
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.plain_bytes - self.bytes_appended)
+
+    def _serialize_page(self, page, source, parent):
+        body = super()._serialize_page(page, source, parent)
+        missing = [key for key in self.target.inherited if key not in page]
+        if not missing:
+            return body
+        # The page took these from its own tree (PyPDF2 copies inherited
+        # values onto pages), so it only lacks ones its file didn't set
+        parts = [body[: -len(b">>")]]
+        for key in missing:
+            key = key.encode()
+            if key == b"/CropBox":
+                value = (
+                    self._serialize(page.raw_get("/MediaBox"), source)
+                    if "/MediaBox" in page
+                    else NEUTRAL[b"/MediaBox"]
+                )
+            else:
+                value = NEUTRAL[key]
+            parts.append(b"%s %s\n" % (key, value))
+        parts.append(b">>")
+        return b"".join(parts)
+
+    def close(self):
+        target = self.target
+
+        # The page tree root, under its own number and generation, with the
+        # appended pages after the existing ones
+        kids = b" ".join(target.kids + [b"%d 0 R" % number for number in self.kids])
+        entries = b"".join(b"%s %s\n" % entry for entry in target.pages_entries)
+        self.offsets[self.pages_ref] = self.position
+        self._write(
+            b"%d %d obj\n<<%s/Kids [%s] /Count %d >>\nendobj\n"
+            % (
+                self.pages_ref,
+                target.pages_generation,
+                entries,
+                kids,
+                target.page_count + self.pages_written,
+            )
+        )
+
+        self._flush_object_stream()
+
+        # Pages reserved but never written (e.g. a cancelled job) become null
+        for number in range(target.size, len(self.offsets)):
+            if self.offsets[number] is None:
+                self._write_object(number, b"null")
+        self._flush_object_stream()
+
+        if target.xref_stream:
+            self._write_update_xref_stream()
+        else:
+            self._write_update_xref_table()
+
+        self.metrics.count("pages", self.pages_written)
+        self.metrics.count("objects", len(self.offsets) - target.size)
+        self.metrics.count("objects_deduplicated", self.objects_deduplicated)
+        self.metrics.count("bytes_written", self.bytes_appended)
+
+    def _subsections(self):
+        # [first number, count] for each run of consecutive changed objects.
+        # Object 0, the head of the free list, is not changed and keeps the
+        # entry of the target's own xref.
+        subsections = []
+        numbers = [self.pages_ref, *range(self.target.size, len(self.offsets))]
+        for number in numbers:
+            if subsections and sum(subsections[-1]) == number:
+                subsections[-1][1] += 1
+            else:
+                subsections.append([number, 1])
+        return subsections
+
+    def _generation(self, number):
+        return self.target.pages_generation if number == self.pages_ref else 0
+
+    def _trailer_entries(self):
+        target = self.target
+        entries = b"/Size %d /Root %s /Prev %d" % (
+            len(self.offsets),
+            target.root,
+            target.startxref,
+        )
+        if target.info is not None:
+            entries += b" /Info " + target.info
+        if target.id is not None:
+            entries += b" /ID " + target.id
+        return entries
+
+    def _write_update_xref_table(self):
+        xref_offset = self.position
+        entries = [b"xref\n"]
+        for first, count in self._subsections():
+            entries.append(b"%d %d\n" % (first, count))
+            entries.extend(
+                b"%010d %05d n\r\n" % (self.offsets[number], self._generation(number))
+                for number in range(first, first + count)
+            )
+        self._write(b"".join(entries))
+        self._write(
+            b"trailer\n<< %s >>\nstartxref\n%d\n%%%%EOF\n"
+            % (self._trailer_entries(), xref_offset)
+        )
+        self.plain_bytes = self.bytes_appended
+
+    def _write_update_xref_stream(self):
+        number = self._reserve()
+        xref_offset = self.position
+        self.offsets[number] = xref_offset
+        subsections = self._subsections()
+        changed = sum(count for _, count in subsections)
+        self.plain_bytes += changed * 20 + 80
+
+        largest = max(
+            offset if isinstance(offset, int) else offset[0]
+            for offset in self.offsets[self.target.size :] + [xref_offset]
+        )
+        width = max(1, (largest.bit_length() + 7) // 8)
+        rows = []
+        for first, count in subsections:
+            for row_number in range(first, first + count):
+                offset = self.offsets[row_number]
+                if isinstance(offset, tuple):
+                    rows.append(
+                        b"\x02"
+                        + offset[0].to_bytes(width, "big")
+                        + offset[1].to_bytes(2, "big")
+                    )
+                else:
+                    rows.append(
+                        b"\x01"
+                        + offset.to_bytes(width, "big")
+                        + self._generation(row_number).to_bytes(2, "big")
+                    )
+        data = zlib.compress(b"".join(rows))
+        index = b" ".join(b"%d %d" % (first, count) for first, count in subsections)
+
+        self._write(
+            b"%d 0 obj\n<< /Type /XRef %s /Index [%s] /W [1 %d 2] "
+            b"/Filter /FlateDecode /Length %d >>\nstream\n"
+            % (number, self._trailer_entries(), index, width, len(data))
+        )
+        self._write(data)
+        self._write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
@@ -0,0 +1,199 @@
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+import config
+from batch import default_workers
+
+# Page counts, encryption flags and sizes for whole folder trees, without
+# opening each document fully:
+#
+#   PDF   the trailer and xref are parsed through mmap and only the catalog
+#         and page tree root are resolved; /Count of the root is the page
+#         count, so the page tree is never walked
+#   PPTX  only presentation.xml is read from the zip
+#
+# Results are kept in a SQLite index keyed by path, size and modification
+# time. A rescan only stats each file and inspects the ones that changed.
+
+INDEX_NAME = "index.sqlite"
+EXTENSIONS = (".pdf", ".pptx")
+
+# Encrypted Office files are OLE compound documents, not zips
+OLE_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+
+# Below this many files a process pool costs more than it saves
+MIN_PARALLEL_FILES = 8
+
+COLUMNS = ("path", "size", "mtime_ns", "kind", "pages", "encrypted", "version", "error")
+
+
+def find_documents(inputs):
+    # Files as given, folders walked recursively for PDF and PPTX files
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, dirs, names in os.walk(path):
+                dirs.sort()
+                paths.extend(
+                    os.path.join(root, name)
+                    for name in sorted(names)
+                    if name.lower().endswith(EXTENSIONS)
+                )
+        else:
+            paths.append(path)
+    return [os.path.abspath(path) for path in paths]
+
+
+def inspect_pdf(path):
+    from memory import open_mapped_pdf
+
+    with open_mapped_pdf(path) as reader:
+        info = {"version": reader.pdf_header[len("%PDF-") :]}
+        info["encrypted"] = "/Encrypt" in reader.trailer
+        if info["encrypted"]:
+            # Readable without a password if the user password is empty;
+            # otherwise the page count stays unknown
+            try:
+                if not reader.decrypt(""):
+                    info["pages"] = None
+                    return info
+            except Exception:
+                info["pages"] = None
+                return info
+        root = reader.trailer["/Root"].get_object()
+        info["pages"] = int(root["/Pages"].get_object()["/Count"])
+    return info
+
+
+def inspect_pptx(path):
+    import zipfile
+    import pptx_package
+
+    try:
+        with pptx_package.Package(path) as package:
+            return {"pages": len(package.slide_ids()), "encrypted": False}
+    except zipfile.BadZipFile:
+        with open(path, "rb") as f:
+            if f.read(len(OLE_MAGIC)) == OLE_MAGIC:
+                return {"pages": None, "encrypted": True}
+        raise
+
+
+def inspect_file(path, size, mtime_ns):
+    # Runs in a worker process; never raises
+    kind = "pptx" if path.lower().endswith(".pptx") else "pdf"
+    entry = {
+        "path": path,
+        "size": size,
+        "mtime_ns": mtime_ns,
+        "kind": kind,
+        "pages": None,
+        "encrypted": False,
+        "version": None,
+        "error": None,
+    }
+    try:
+        entry.update(inspect_pptx(path) if kind == "pptx" else inspect_pdf(path))
+    except Exception as e:
+        entry["error"] = str(e) or type(e).__name__
+    return entry
+
+
+def default_index_path():
+    return os.path.join(config.app_data_dir(), INDEX_NAME)
+
+
+def open_index(index_path):
+    db = sqlite3.connect(index_path)
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            path TEXT PRIMARY KEY,
+            size INTEGER NOT NULL,
+            mtime_ns INTEGER NOT NULL,
+            kind TEXT NOT NULL,
+            pages INTEGER,
+            encrypted INTEGER NOT NULL,
+            version TEXT,
+            error TEXT
+        )
+    """)
+    return db
+
+
+def _cached_entries(db, paths):
+    # Index rows for the given paths, in batches below SQLite's variable limit
+    entries = {}
+    for start in range(0, len(paths), 500):
+        batch = paths[start : start + 500]
+        rows = db.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM documents "
+            f"WHERE path IN ({', '.join('?' * len(batch))})",
+            batch,
+        )
+        for row in rows:
+            entry = dict(zip(COLUMNS, row))
+            entry["encrypted"] = bool(entry["encrypted"])
+            entries[entry["path"]] = entry
+    return entries
+
+
+def inspect_paths(inputs, workers=None, index_path=None, use_index=True):
+    started = time.perf_counter()
+    paths = find_documents(inputs)
+
+    stats = {}
+    results = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            results[path] = {"path": path, "error": e.strerror}
+            continue
+        stats[path] = (stat.st_size, stat.st_mtime_ns)
+
+    db = open_index(index_path or default_index_path()) if use_index else None
+    try:
+        cached = _cached_entries(db, list(stats)) if db is not None else {}
+        stale = []
+        for path, (size, mtime_ns) in stats.items():
+            entry = cached.get(path)
+            if entry and (entry["size"], entry["mtime_ns"]) == (size, mtime_ns):
+                results[path] = entry
+            else:
+                stale.append((path, size, mtime_ns))
+
+        if len(stale) >= MIN_PARALLEL_FILES and (workers or default_workers()) > 1:
+            with ProcessPoolExecutor(max_workers=workers or default_workers()) as pool:
+                inspected = list(pool.map(inspect_file, *zip(*stale), chunksize=16))
+        else:
+            inspected = [inspect_file(*args) for args in stale]
+
+        if db is not None and inspected:
+            with db:
+                db.executemany(
+                    f"INSERT OR REPLACE INTO documents ({', '.join(COLUMNS)}) "
+                    f"VALUES ({', '.join('?' * len(COLUMNS))})",
+                    [tuple(entry[column] for column in COLUMNS) for entry in inspected],
+                )
+    finally:
+        if db is not None:
+            db.close()
+
+    for entry in inspected:
+        results[entry["path"]] = entry
+    ordered = [results[path] for path in paths]
+    for entry in ordered:
+        entry.pop("mtime_ns", None)
+    failed = sum(1 for entry in ordered if entry.get("error"))
+    return {
+        "ok": failed == 0,
+        "operation": "inspect",
+        "files": len(ordered),
+        "inspected": len(inspected),
+        "cached": len(stats) - len(stale),
+        "failed": failed,
+        "pages": sum(entry.get("pages") or 0 for entry in ordered),
+        "elapsed": round(time.perf_counter() - started, 6),
+        "results": ordered,
+    }
@@ -0,0 +1,118 @@
+import os
+import time
+import config
+from core import (
+    extract_pages,
+    extract_slides,
+    merge_pdfs,
+    merge_presentations,
+    split_pages,
+)
+
+# Jobs queued from the window's forms. The queue is saved to the app data
+# folder after every change, so jobs queued for an overnight run survive a
+# crash or restart. Each job is a plain dict:
+#
+#   {"id": 3, "operation": "extract", "args": [...], "kwargs": {...},
+#    "status": "queued", "queued_at": ..., "elapsed": ..., "error": ...}
+#
+# Jobs that were running when the app stopped are queued again on load.
+
+QUEUE_STATE = "queue.json"
+
+OPERATIONS = {
+    "extract": extract_pages,
+    "split": split_pages,
+    "merge": merge_pdfs,
+    "slides": extract_slides,
+    "merge-slides": merge_presentations,
+}
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+def describe(job):
+    # "extract report.pdf (1-3)" or "merge a.pdf + 2 more"
+    operation, args = job["operation"], job["args"]
+    if operation in ("merge", "merge-slides"):
+        first = os.path.basename(args[0][0])
+        return f"{operation} {first} + {len(args[0]) - 1} more"
+    return f"{operation} {os.path.basename(args[0])} ({args[2]})"
+
+
+class JobQueue:
+    def __init__(self, jobs=(), workers=1):
+        self.jobs = list(jobs)
+        self.workers = workers
+        self.next_id = max((job["id"] for job in self.jobs), default=0) + 1
+
+    @classmethod
+    def load(cls):
+        state = config.load_state(QUEUE_STATE, {})
+        jobs = [job for job in state.get("jobs", []) if job["operation"] in OPERATIONS]
+        for job in jobs:
+            if job["status"] == RUNNING:
+                job["status"] = QUEUED  # Interrupted by a crash or restart
+        return cls(jobs, state.get("workers", 1))
+
+    def save(self):
+        config.save_state(QUEUE_STATE, {"workers": self.workers, "jobs": self.jobs})
+
+    def add(self, operation, args, kwargs):
+        job = {
+            "id": self.next_id,
+            "operation": operation,
+            "args": list(args),
+            "kwargs": kwargs,
+            "status": QUEUED,
+            "queued_at": time.time(),
+        }
+        self.next_id += 1
+        self.jobs.append(job)
+        self.save()
+        return job
+
+    def get(self, job_id):
+        return next((job for job in self.jobs if job["id"] == job_id), None)
+
+    def next_job(self):
+        return next((job for job in self.jobs if job["status"] == QUEUED), None)
+
+    def count(self, *statuses):
+        return sum(1 for job in self.jobs if job["status"] in statuses)
+
+    def start(self, job):
+        job["status"] = RUNNING
+        job["started_at"] = time.time()
+        self.save()
+
+    def finish(self, job, status, result=None, error=None):
+        job["status"] = status
+        job["elapsed"] = round(time.time() - job.get("started_at", time.time()), 3)
+        if result is not None:
+            job["output"] = result["output"]
+            job["elapsed"] = result["elapsed"]
+        if error is not None:
+            job["error"] = error
+        self.save()
+
+    def requeue(self, job):
+        job["status"] = QUEUED
+        self.save()
+
+    def remove(self, job):
+        self.jobs.remove(job)
+        self.save()
+
+    def clear_finished(self):
+        self.jobs = [job for job in self.jobs if job["status"] not in FINISHED]
+        self.save()
+
+    def set_workers(self, workers):
+        self.workers = workers
+        self.save()
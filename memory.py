@@ -0,0 +1,143 @@
+import mmap
+import os
+import sys
+from array import array
+from bisect import bisect_right
+from contextlib import contextmanager
+from core import JobError
+
+# Large-file support: memory-mapped PDF input and a resident-memory ceiling.
+# The copy in pdf_stream already resolves only the objects reachable from the
+# selected pages; in large-file mode the reader's object cache and the mapped
+# pages are also released after every page, so memory tracks the largest
+# page rather than the document.
+
+# Resolving a stream reads its data, and serializing it makes another copy
+RESOLVE_OVERHEAD = 3
+
+
+def current_rss():
+    if sys.platform == "win32":
+        return _windows_memory_info().WorkingSetSize
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # No /proc (macOS): the peak is the closest available figure
+        return peak_rss()
+
+
+def peak_rss():
+    if sys.platform == "win32":
+        return _windows_memory_info().PeakWorkingSetSize
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _windows_memory_info():
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    ctypes.windll.psapi.GetProcessMemoryInfo(
+        process, ctypes.byref(counters), counters.cb
+    )
+    return counters
+
+
+class MemoryGuard:
+    def __init__(self, reader, limit):
+        self.reader = reader
+        self.limit = limit
+        # Object sizes are estimated from the gaps between xref offsets
+        offsets = sorted(
+            offset for objects in reader.xref.values() for offset in objects.values()
+        )
+        self.offsets = array("q", offsets)
+        self.stream = reader.stream
+        self.file_size = len(reader.stream)
+
+    def _estimated_size(self, idnum):
+        if idnum in self.reader.xref_objStm:
+            idnum = self.reader.xref_objStm[idnum][0]
+        offset = self.reader.xref.get(0, {}).get(idnum)
+        if offset is None:
+            return 0
+        index = bisect_right(self.offsets, offset)
+        end = self.offsets[index] if index < len(self.offsets) else self.file_size
+        return end - offset
+
+    def _fail(self, rss, needed=0):
+        raise JobError(
+            f"Stopped: the job would exceed the memory limit of "
+            f"{self.limit // (1024 * 1024)} MB "
+            f"(using {rss // (1024 * 1024)} MB, next object needs about "
+            f"{needed // (1024 * 1024)} MB)."
+        )
+
+    def before_resolve(self, ref):
+        # Refuse to load an object that would push memory past the limit
+        if self.limit is None:
+            return
+        needed = self._estimated_size(ref.idnum) * RESOLVE_OVERHEAD
+        rss = current_rss()
+        if rss + needed > self.limit:
+            self._fail(rss, needed)
+
+    def after_page(self):
+        # Drop parsed objects and mapped file pages the next page may not need
+        self.reader.resolved_objects.clear()
+        if hasattr(self.stream, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+            self.stream.madvise(mmap.MADV_DONTNEED)
+        rss = current_rss()
+        if self.limit is not None and rss > self.limit:
+            self._fail(rss)
+
+
+def resolve(obj, guard=None):
+    # obj.get_object(), checked against the guard's limit first when obj is
+    # a reference that would load something from the file
+    if guard is not None and hasattr(obj, "idnum"):
+        guard.before_resolve(obj)
+    return obj.get_object()
+
+
+@contextmanager
+def open_mapped_pdf(path):
+    # Read through mmap instead of PyPDF2's default of loading the whole file
+    # into memory; only the parts that are actually parsed are paged in
+    from PyPDF2 import PdfReader
+
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield PdfReader(mapped)
+        finally:
+            mapped.close()
+
+
+def mapped_page_count(path):
+    # Page count from the page tree root, without loading the file or parsing
+    # the pages
+    with open_mapped_pdf(path) as reader:
+        root = reader.trailer["/Root"].get_object()
+        return int(root["/Pages"].get_object()["/Count"])
@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Per-job stage timings and counters, structured logging, and opt-in
+# profiling. Every operation in core returns its metrics in the result under
+# "metrics" and logs them as one "job finished" record:
+#
+#   "stages": seconds spent opening the input, parsing the selection,
+#             resolving source objects, serializing, compressing and writing
+#   "counters": pages, objects, objects_deduplicated, bytes_written, ...
+#
+# Records go nowhere unless logging is configured, e.g. with SPLITTER_LOG
+# (a file path, or "-" for stderr) or the command line's --log.
+
+logger = logging.getLogger("splitter")
+logger.addHandler(logging.NullHandler())
+
+# File the log records are appended to; "-" is stderr
+LOG_DESTINATION = os.environ.get("SPLITTER_LOG")
+
+# "cpu" (cProfile) or "memory" (tracemalloc) to profile every job
+PROFILE_MODE = os.environ.get("SPLITTER_PROFILE")
+
+PROFILE_MODES = ("cpu", "memory")
+PROFILE_EXTENSIONS = {"cpu": ".prof", "memory": ".tracemalloc"}
+
+
+class JobMetrics:
+    def __init__(self):
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._mark = time.perf_counter()
+
+    def add_time(self, stage, seconds):
+        self.stages[stage] += seconds
+
+    def lap(self, stage):
+        # Charge the time since the previous lap (or creation) to a stage
+        now = time.perf_counter()
+        self.stages[stage] += now - self._mark
+        self._mark = now
+
+    @contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] += time.perf_counter() - started
+
+    def count(self, name, amount=1):
+        self.counters[name] += amount
+
+    def absorb(self, other, within=None):
+        # Add another job part's metrics (e.g. a writer's). Its stages ran
+        # inside `within`, which keeps only the time they don't account for.
+        for stage, seconds in other.stages.items():
+            self.stages[stage] += seconds
+            if within is not None:
+                self.stages[within] = max(0.0, self.stages[within] - seconds)
+        for name, amount in other.counters.items():
+            self.counters[name] += amount
+
+    def as_dict(self):
+        return {
+            "stages": {name: round(value, 6) for name, value in self.stages.items()},
+            "counters": dict(self.counters),
+        }
+
+    def finish(self, result):
+        # Attach to a job result and log it
+        result["metrics"] = self.as_dict()
+        logger.info("job finished", extra={"job": result})
+        return result
+
+
+def log_failure(operation, message):
+    logger.warning(
+        "job failed",
+        extra={"job": {"ok": False, "operation": operation, "error": message}},
+    )
+
+
+def summarize(result):
+    # One line for the window: "12 pages in 0.41 s (open 0.05 s, write ...)"
+    stages = result.get("metrics", {}).get("stages", {})
+    slowest = sorted(stages.items(), key=lambda item: item[1], reverse=True)[:3]
+    details = ", ".join(f"{name} {seconds:.2f} s" for name, seconds in slowest)
+    unit = (
+        "slides" if result.get("operation") in ("slides", "merge-slides") else "pages"
+    )
+    summary = f"{result.get('pages', 0)} {unit} in {result['elapsed']:.2f} s"
+    return f"{summary} ({details})" if details else summary
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "job", {}))
+        return json.dumps(entry)
+
+
+def configure_logging(destination=LOG_DESTINATION):
+    # JSON lines, one record per job
+    if not destination:
+        return
+    if destination == "-":
+        handler = logging.StreamHandler()
+    else:
+        handler = logging.FileHandler(destination, encoding="utf-8")
+    handler.setFormatter(JsonFormatter())
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+
+
+def default_profile_path(operation, mode, directory=None):
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    name = f"splitter-{operation}-{stamp}{PROFILE_EXTENSIONS[mode]}"
+    return os.path.join(directory or os.getcwd(), name)
+
+
+@contextmanager
+def profiled(mode, path):
+    # Profile one job. "cpu" writes cProfile stats (read them with pstats or
+    # snakeviz) and only sees the calling thread; "memory" writes a
+    # tracemalloc snapshot (tracemalloc.Snapshot.load).
+    if mode is None:
+        yield
+        return
+    if mode not in PROFILE_MODES:
+        raise ValueError(f"Unknown profile mode: {mode!r}")
+
+    if mode == "cpu":
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(path)
+            logger.info("profile written", extra={"job": {"profile": path}})
+        return
+
+    import tracemalloc
+
+    tracemalloc.start(25)
+    try:
+        yield
+    finally:
+        tracemalloc.take_snapshot().dump(path)
+        tracemalloc.stop()
+        logger.info("profile written", extra={"job": {"profile": path}})
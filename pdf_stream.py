@@ -0,0 +1,415 @@
+import hashlib
+import zlib
+from contextlib import nullcontext
+from io import BytesIO
+from time import perf_counter
+from metrics import JobMetrics
+from PyPDF2.generic import DictionaryObject, ArrayObject, IndirectObject, StreamObject
+
+# A PDF writer that copies pages from PyPDF2 readers straight to the output
+# stream. Objects are serialized and written as soon as they are reached, so
+# nothing is kept in memory except the output offsets and, while an input is
+# being copied, the map from its object numbers to ours.
+#
+# With optimize=True (the default) the output is also compacted:
+# - objects are copied children first, so two objects with the same bytes
+#   (fonts, images, ICC profiles repeated across inputs) hash the same and
+#   are written once;
+# - objects other than streams are packed into compressed object streams and
+#   the cross-reference table becomes a compressed xref stream (PDF 1.5).
+
+PDF_HEADER = b"%PDF-1.7\n%\xe2\xe3\xcf\xd3\n"
+
+# Page keys that point back into the source page tree or structure tree
+PAGE_EXCLUDED_KEYS = ("/Parent", "/StructParents")
+
+# Objects that belong to the source document structure. They are never copied
+# on their own: references to them (e.g. link annotations pointing at pages
+# that were not selected) are written as null.
+SKIPPED_TYPES = ("/Page", "/Pages", "/Catalog")
+
+# Objects per compressed object stream
+OBJECT_STREAM_SIZE = 200
+
+# Pages per intermediate page tree node written by add_run
+PAGE_TREE_NODE_SIZE = 128
+
+# Pages whose images are queued for recompression ahead of the one written
+PREFETCH_PAGES = 16
+
+# Size of one entry in a classic xref table, used to estimate the bytes saved
+_XREF_ENTRY_SIZE = 20
+
+
+class PdfSource:
+    def __init__(self, reader, lock=None, guard=None):
+        self.reader = reader
+        # Source object number -> output object number
+        self.object_map = {}
+        # Objects whose children are being copied; a reference back to one of
+        # them is a cycle and gets a number before the object is written
+        self.visiting = set()
+        # Several writers may copy from one reader on different threads;
+        # PyPDF2 readers seek a shared stream, so object lookups are locked
+        self.lock = lock or nullcontext()
+        # Optional memory.MemoryGuard consulted before each object is loaded
+        self.guard = guard
+        # Source image number -> recompression key (see recompress)
+        self.images = {}
+
+
+class StreamingPdfWriter:
+    def __init__(self, stream, optimize=True, images=None):
+        self.stream = stream
+        self.optimize = optimize
+        # Optional recompress.ImageRecompressor for downsampling images
+        self.images = images
+        self.position = 0
+        # offsets[n] is the byte offset of object n, or (object stream number,
+        # index) once packed, None while only reserved
+        self.offsets = [0]
+        # Root page tree entries: pages and intermediate /Pages nodes
+        self.kids = []
+        self.pages_written = 0
+        self.written_pages = set()
+        self.digests = {}
+        self.packed = []
+        self.objects_deduplicated = 0
+        # What the same objects would take written plainly with an xref table
+        self.plain_bytes = len(PDF_HEADER)
+        # Time spent resolving, serializing, compressing and writing
+        self.metrics = JobMetrics()
+        self._start()
+
+    def _start(self):
+        self._write(PDF_HEADER)
+        self.pages_ref = self._reserve()
+
+    @property
+    def page_count(self):
+        return self.pages_written
+
+    @property
+    def bytes_saved(self):
+        return max(0, self.plain_bytes - self.position)
+
+    def _write(self, data):
+        started = perf_counter()
+        self.stream.write(data)
+        self.position += len(data)
+        self.metrics.add_time("write", perf_counter() - started)
+
+    def _reserve(self):
+        self.offsets.append(None)
+        return len(self.offsets) - 1
+
+    def _write_object(self, number, body, is_stream=False):
+        self.plain_bytes += len(b"%d 0 obj\n\nendobj\n" % number) + len(body)
+        self.plain_bytes += _XREF_ENTRY_SIZE
+        if self.optimize and not is_stream:
+            self.packed.append((number, body))
+            if len(self.packed) >= OBJECT_STREAM_SIZE:
+                self._flush_object_stream()
+            return
+        self.offsets[number] = self.position
+        self._write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    def _flush_object_stream(self):
+        if not self.packed:
+            return
+        number = self._reserve()
+        header = []
+        bodies = []
+        offset = 0
+        for index, (packed_number, body) in enumerate(self.packed):
+            self.offsets[packed_number] = (number, index)
+            header.append(b"%d %d" % (packed_number, offset))
+            bodies.append(body)
+            offset += len(body) + 1
+        header = b" ".join(header) + b"\n"
+        with self.metrics.stage("compress"):
+            data = zlib.compress(header + b"\n".join(bodies))
+        self.packed = []
+        self.metrics.count("object_streams")
+
+        self.offsets[number] = self.position
+        self._write(
+            b"%d 0 obj\n<< /Type /ObjStm /N %d /First %d /Filter /FlateDecode "
+            b"/Length %d >>\nstream\n" % (number, len(bodies), len(header), len(data))
+        )
+        self._write(data)
+        self._write(b"\nendstream\nendobj\n")
+
+    def open_source(self, reader, page_indices, lock=None, guard=None):
+        source = PdfSource(reader, lock, guard)
+        # Map every selected page up front so links between them survive
+        with source.lock:
+            refs = [reader.pages[index].indirect_reference for index in page_indices]
+        for ref in refs:
+            if ref.idnum not in source.object_map:
+                source.object_map[ref.idnum] = self._reserve()
+        return source
+
+    def add_page(self, source, index):
+        with source.lock:
+            page = source.reader.pages[index]
+        if self.images is not None:
+            self.images.queue(source, [page])
+        self.kids.append(self._add_page(source, page, self.pages_ref))
+        self.pages_written += 1
+
+    def add_run(self, source, run, on_page=None):
+        # Copy a run of source pages (any Python range) under intermediate
+        # page tree nodes, so the root's /Kids grows with the number of runs
+        # rather than pages. on_page is called after each page.
+        for start in range(0, len(run), PAGE_TREE_NODE_SIZE):
+            chunk = run[start : start + PAGE_TREE_NODE_SIZE]
+            with source.lock:
+                pages = [source.reader.pages[index] for index in chunk]
+            if len(pages) == 1:
+                self.add_page(source, chunk[0])
+                if on_page is not None:
+                    on_page()
+                continue
+
+            node = self._reserve()
+            kids = []
+            queued = 0
+            for position, page in enumerate(pages):
+                if self.images is not None and queued <= position:
+                    # Images of the next pages are recompressed while
+                    # this one is written
+                    queued = position + PREFETCH_PAGES
+                    self.images.queue(source, pages[position:queued])
+                kids.append(self._add_page(source, page, node))
+                self.pages_written += 1
+                if on_page is not None:
+                    on_page()
+            kids = b" ".join(b"%d 0 R" % number for number in kids)
+            self._write_object(
+                node,
+                b"<< /Type /Pages /Parent %d 0 R /Kids [%s] /Count %d >>"
+                % (self.pages_ref, kids, len(pages)),
+            )
+            self.kids.append(node)
+
+    def _add_page(self, source, page, parent):
+        number = source.object_map.get(page.indirect_reference.idnum)
+        if number is None or number in self.written_pages:
+            # Acrobat rejects two page tree entries pointing at the same page
+            # object, so a page selected twice gets a second object
+            number = self._reserve()
+
+        # Copy everything the page reaches first, then the page itself
+        for child in _child_refs(page, PAGE_EXCLUDED_KEYS):
+            self._copy(source, child)
+        with self.metrics.stage("serialize"):
+            body = self._serialize_page(page, source, parent)
+        self._write_object(number, body)
+        self.written_pages.add(number)
+        return number
+
+    def _copy(self, source, ref):
+        # Depth-first, children before parents, without recursion: source
+        # structures such as annotation chains can be very deep
+        stack = [(ref, False)]
+        while stack:
+            ref, expanded = stack.pop()
+            idnum = ref.idnum
+
+            if not expanded:
+                if idnum in source.visiting or idnum in source.object_map:
+                    continue
+                started = perf_counter()
+                with source.lock:
+                    if source.guard is not None:
+                        source.guard.before_resolve(ref)
+                    obj = source.reader.get_object(ref)
+                self.metrics.add_time("resolve", perf_counter() - started)
+                source.visiting.add(idnum)
+                stack.append((ref, True))
+                children = [] if obj is None or _is_skipped(obj) else _child_refs(obj)
+                for child in children:
+                    if child.idnum in source.visiting:
+                        # A cycle: number the child now so this object can
+                        # refer to it; it is written when its own turn comes
+                        if child.idnum not in source.object_map:
+                            source.object_map[child.idnum] = self._reserve()
+                    elif child.idnum not in source.object_map:
+                        stack.append((child, False))
+                continue
+
+            started = perf_counter()
+            with source.lock:
+                obj = source.reader.get_object(ref)
+            resolved = serializing = perf_counter()
+            source.visiting.discard(idnum)
+            if self.images is not None and isinstance(obj, StreamObject):
+                # Waiting for the worker is timed by the recompressor
+                obj = self.images.replace(source, idnum, obj)
+                serializing = perf_counter()
+            if obj is None or _is_skipped(obj):
+                body = b"null"
+            else:
+                body = self._serialize(obj, source)
+            self.metrics.add_time("resolve", resolved - started)
+            self.metrics.add_time("serialize", perf_counter() - serializing)
+            is_stream = isinstance(obj, StreamObject)
+
+            number = source.object_map.get(idnum)
+            if number is not None:
+                # Numbered early because of a cycle; can't be deduplicated
+                self._write_object(number, body, is_stream)
+                continue
+
+            digest = self.optimize and hashlib.blake2b(body, digest_size=16).digest()
+            if digest in self.digests:
+                source.object_map[idnum] = self.digests[digest]
+                self.objects_deduplicated += 1
+                self.plain_bytes += len(body) + _XREF_ENTRY_SIZE + 20
+                continue
+
+            number = source.object_map[idnum] = self._reserve()
+            if self.optimize:
+                self.digests[digest] = number
+            self._write_object(number, body, is_stream)
+
+    def _serialize_page(self, page, source, parent):
+        parts = [b"<<"]
+        for key, value in page.items():
+            if key in PAGE_EXCLUDED_KEYS:
+                continue
+            parts.append(b"%s %s\n" % (_encode(key), self._serialize(value, source)))
+        parts.append(b"/Parent %d 0 R\n>>" % parent)
+        return b"".join(parts)
+
+    def _serialize(self, obj, source):
+        # Every reference must already be copied (see _copy)
+        if isinstance(obj, IndirectObject):
+            return b"%d 0 R" % source.object_map[obj.idnum]
+        if isinstance(obj, DictionaryObject):
+            is_stream = isinstance(obj, StreamObject)
+            parts = [b"<<"]
+            for key, value in obj.items():
+                # The stream length may be an indirect object; write it directly
+                if is_stream and key == "/Length":
+                    continue
+                parts.append(
+                    b"%s %s\n" % (_encode(key), self._serialize(value, source))
+                )
+            if not is_stream:
+                parts.append(b">>")
+                return b"".join(parts)
+            # Stream data is copied as stored in the source, still encoded
+            data = obj._data
+            parts.append(b"/Length %d\n>>\nstream\n" % len(data))
+            parts.append(data)
+            parts.append(b"\nendstream")
+            return b"".join(parts)
+        if isinstance(obj, ArrayObject):
+            return (
+                b"[" + b" ".join(self._serialize(item, source) for item in obj) + b"]"
+            )
+        return _encode(obj)
+
+    def close(self):
+        # Page tree root and catalog
+        kids = b" ".join(b"%d 0 R" % number for number in self.kids)
+        self._write_object(
+            self.pages_ref,
+            b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, self.pages_written),
+        )
+        root = self._reserve()
+        self._write_object(root, b"<< /Type /Catalog /Pages %d 0 R >>" % self.pages_ref)
+
+        self._flush_object_stream()
+
+        # Pages reserved but never written (e.g. a cancelled job) become null
+        for number, offset in enumerate(self.offsets):
+            if offset is None:
+                self._write_object(number, b"null")
+        self._flush_object_stream()
+
+        if self.optimize:
+            self._write_xref_stream(root)
+        else:
+            self._write_xref_table(root)
+
+        self.metrics.count("pages", self.pages_written)
+        self.metrics.count("objects", len(self.offsets) - 1)
+        self.metrics.count("objects_deduplicated", self.objects_deduplicated)
+        self.metrics.count("bytes_written", self.position)
+
+    def _write_xref_table(self, root):
+        xref_offset = self.position
+        entries = [b"xref\n0 %d\n0000000000 65535 f\r\n" % len(self.offsets)]
+        entries.extend(b"%010d 00000 n\r\n" % offset for offset in self.offsets[1:])
+        self._write(b"".join(entries))
+        self._write(
+            b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+            % (len(self.offsets), root, xref_offset)
+        )
+        self.plain_bytes = self.position
+
+    def _write_xref_stream(self, root):
+        number = self._reserve()
+        xref_offset = self.position
+        self.offsets[number] = xref_offset
+        self.plain_bytes += len(self.offsets) * _XREF_ENTRY_SIZE + 80
+
+        # Field widths: type, offset or object stream number, generation or index
+        largest = max(
+            offset if isinstance(offset, int) else offset[0] for offset in self.offsets
+        )
+        width = max(1, (largest.bit_length() + 7) // 8)
+        rows = [b"\x00" + (0).to_bytes(width, "big") + b"\xff\xff"]
+        for offset in self.offsets[1:]:
+            if isinstance(offset, tuple):
+                rows.append(
+                    b"\x02"
+                    + offset[0].to_bytes(width, "big")
+                    + offset[1].to_bytes(2, "big")
+                )
+            else:
+                rows.append(b"\x01" + offset.to_bytes(width, "big") + b"\x00\x00")
+        data = zlib.compress(b"".join(rows))
+
+        self._write(
+            b"%d 0 obj\n<< /Type /XRef /Size %d /Root %d 0 R /W [1 %d 2] "
+            b"/Filter /FlateDecode /Length %d >>\nstream\n"
+            % (number, len(self.offsets), root, width, len(data))
+        )
+        self._write(data)
+        self._write(b"\nendstream\nendobj\nstartxref\n%d\n%%%%EOF\n" % xref_offset)
+
+
+def _is_skipped(obj):
+    return isinstance(obj, DictionaryObject) and obj.get("/Type") in SKIPPED_TYPES
+
+
+def _child_refs(obj, excluded_keys=()):
+    # Indirect references in an object's direct structure
+    refs = []
+    if isinstance(obj, StreamObject):
+        excluded_keys += ("/Length",)
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if isinstance(item, IndirectObject):
+            refs.append(item)
+        elif isinstance(item, DictionaryObject):
+            for key, value in item.items():
+                if item is obj and key in excluded_keys:
+                    continue
+                pending.append(value)
+        elif isinstance(item, ArrayObject):
+            pending.extend(item)
+    # Reversed so children are copied in the order they appear
+    refs.reverse()
+    return refs
+
+
+def _encode(obj):
+    buffer = BytesIO()
+    obj.write_to_stream(buffer, None)
+    return buffer.getvalue()
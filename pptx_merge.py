@@ -0,0 +1,454 @@
+import copy
+import hashlib
+import posixpath
+import re
+import uuid
+import zipfile
+from core import JobCancelled, JobError
+from metrics import JobMetrics
+from pptx_package import (
+    CONTENT_TYPES,
+    CT_NS,
+    P_NS,
+    R_NS,
+    RELS_NS,
+    Package,
+    _serialize_xml,
+    copy_member_raw,
+    rels_name,
+    write_member,
+)
+from sinks import open_output
+
+# Merging presentations at zip level. The first deck is the base: all of its
+# parts are kept as they are. Slides from the other decks are appended with
+# every part they reach (layouts, masters, themes, media, notes), copied byte
+# for byte under new names; only relationship files, presentation.xml and
+# [Content_Types].xml are rewritten.
+#
+# Nothing is copied twice: media with the same SHA-256 as a part already in
+# the output is shared, and a slide master whose parts (layouts, theme,
+# media) all hash the same as one already in the output is reused with its
+# layouts. Notes and handout masters exist once per presentation, so the
+# base deck's are kept.
+
+SLIDE_MASTER = R_NS + "/slideMaster"
+SLIDE = R_NS + "/slide"
+NOTES_MASTER = R_NS + "/notesMaster"
+HANDOUT_MASTER = R_NS + "/handoutMaster"
+SINGLE_MASTERS = {
+    NOTES_MASTER: "notesMasterIdLst",
+    HANDOUT_MASTER: "handoutMasterIdLst",
+}
+
+# Slide ids and master/layout ids live in separate ranges
+FIRST_SLIDE_ID = 256
+FIRST_MASTER_ID = 2147483648
+
+# Lists in presentation.xml, in schema order
+PRESENTATION_LISTS = ("sldMasterIdLst", "notesMasterIdLst", "handoutMasterIdLst")
+
+_NUMBERED_NAME = re.compile(r"^(.*?)(\d*)(\.[^.]*)?$")
+
+
+def _relative(source_part, target_part):
+    return posixpath.relpath(target_part, posixpath.dirname(source_part))
+
+
+def _renamed(info, name):
+    if info.filename == name:
+        return info
+    info = copy.copy(info)
+    info.filename = info.orig_filename = name
+    return info
+
+
+def _rel_order(item):
+    # Relationship ids in numeric order: rId2 before rId10
+    rel_id = item[0].get("Id")
+    return len(rel_id), rel_id
+
+
+class _Deck:
+    def __init__(self, path):
+        self.path = path
+        self.package = Package(path)
+        self.file = open(path, "rb")
+        self.mapped = {}  # part name -> part name in the output
+        self.digests = {}
+
+        types = self.package.read_xml(CONTENT_TYPES)
+        self.defaults = {
+            default.get("Extension").lower(): default.get("ContentType")
+            for default in types.iter(f"{{{CT_NS}}}Default")
+        }
+        self.overrides = {
+            override.get("PartName").lstrip("/"): override.get("ContentType")
+            for override in types.iter(f"{{{CT_NS}}}Override")
+        }
+
+    def close(self):
+        self.file.close()
+        self.package.close()
+
+    def info(self, name):
+        return self.package.zip.getinfo(name)
+
+    def has_rels(self, name):
+        return rels_name(name) in self.package.names
+
+    def relationships(self, name):
+        root, rels = self.package.relationships(name)
+        return root, [
+            (rel, target) for rel, target in rels if target in self.package.names
+        ]
+
+    def digest(self, name):
+        if name not in self.digests:
+            digest = hashlib.sha256()
+            with self.package.zip.open(name) as part:
+                for chunk in iter(lambda: part.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            self.digests[name] = digest.digest()
+        return self.digests[name]
+
+
+class _Output:
+    def __init__(self, base):
+        self.base = base
+        self.names = set(base.package.names)
+        self.members = []  # (deck, ZipInfo or None, data or None, name)
+        self.member_index = {}
+        self.overrides = {}  # content types of the added parts
+        self.defaults = {}  # extensions the base deck has no default for
+        self.by_size = {}  # (size, CRC) -> [(deck, name, output name)]
+        self.designs = {}  # master digests -> output part names in order
+        self.counters = {}  # (folder, prefix, extension) -> next number
+        self.parts_deduplicated = 0
+        self.masters_reused = 0
+
+        for name in base.package.names:
+            base.mapped[name] = name
+            if not name.endswith(".rels") and not base.has_rels(name):
+                self._index(base, name, name)
+
+    def _index(self, deck, name, output_name):
+        info = deck.info(name)
+        key = (info.file_size, info.CRC)
+        self.by_size.setdefault(key, []).append((deck, name, output_name))
+
+    def _duplicate(self, deck, name):
+        # An output part with the same bytes, found by size and CRC and
+        # confirmed by hash
+        info = deck.info(name)
+        extension = posixpath.splitext(name)[1]
+        for other, other_name, output_name in self.by_size.get(
+            (info.file_size, info.CRC), ()
+        ):
+            if posixpath.splitext(other_name)[1] != extension:
+                continue
+            if other.digest(other_name) == deck.digest(name):
+                return output_name
+        return None
+
+    def _new_name(self, name):
+        # slide3.xml -> the next free slideN.xml in the same folder
+        folder, base_name = posixpath.split(name)
+        prefix, _, extension = _NUMBERED_NAME.match(base_name).groups()
+        extension = extension or ""
+        key = (folder, prefix, extension)
+        number = self.counters.get(key, 1)
+        while posixpath.join(folder, f"{prefix}{number}{extension}") in self.names:
+            number += 1
+        self.counters[key] = number + 1
+        new_name = posixpath.join(folder, f"{prefix}{number}{extension}")
+        self.names.add(new_name)
+        return new_name
+
+    def _add(self, deck, info, data, name):
+        self.member_index[name] = len(self.members)
+        self.members.append((deck, info, data, name))
+
+    def replace(self, name, data):
+        _, info, _, _ = self.members[self.member_index[name]]
+        self.members[self.member_index[name]] = (None, info, data, name)
+
+    def copy_part(self, deck, name):
+        # Copy a part and everything it reaches; returns its output name
+        if name in deck.mapped:
+            return deck.mapped[name]
+
+        if not deck.has_rels(name):
+            existing = self._duplicate(deck, name)
+            if existing is not None:
+                deck.mapped[name] = existing
+                self.parts_deduplicated += 1
+                return existing
+
+        new_name = deck.mapped[name] = self._new_name(name)
+        info = deck.info(name)
+        self._add(deck, info, None, new_name)
+        extension = posixpath.splitext(name)[1].lstrip(".").lower()
+        if name in deck.overrides:
+            self.overrides[new_name] = deck.overrides[name]
+        elif extension not in self.base.defaults and extension in deck.defaults:
+            self.defaults[extension] = deck.defaults[extension]
+
+        rels_root, rels = deck.relationships(name)
+        if rels_root is None:
+            self._index(deck, name, new_name)
+            return new_name
+
+        # Relationship ids stay the same, so the part itself needs no change
+        for rel, target in rels:
+            rel.set("Target", _relative(new_name, self.copy_part(deck, target)))
+        rels_info = deck.info(rels_name(name))
+        self._add(None, rels_info, _serialize_xml(rels_root), rels_name(new_name))
+        self.names.add(rels_name(new_name))
+        return new_name
+
+    def design(self, deck, master):
+        # A master and the parts it reaches (layouts, theme, media) in a
+        # fixed order, and their digests
+        order = [master]
+        seen = {master}
+        for part in order:
+            _, rels = deck.relationships(part)
+            for _, target in sorted(rels, key=_rel_order):
+                if target not in seen:
+                    seen.add(target)
+                    order.append(target)
+        return tuple(deck.digest(part) for part in order), order
+
+
+class _Presentation:
+    # The base deck's presentation.xml and its relationships, grown as slides
+    # and masters are appended
+    def __init__(self, base):
+        self.name = base.package.main_part()
+        self.xml = base.package.read_xml(self.name)
+        self.rels, rels = base.package.relationships(self.name)
+        self.masters = {}  # relationship type -> target, for notes/handout
+        master_ids = [FIRST_MASTER_ID - 1]
+        for rel, target in rels:
+            if rel.get("Type") in SINGLE_MASTERS:
+                self.masters[rel.get("Type")] = target
+            elif rel.get("Type") == SLIDE_MASTER:
+                master = base.package.read_xml(target)
+                master_ids.extend(
+                    int(layout.get("id"))
+                    for layout in master.iter(f"{{{P_NS}}}sldLayoutId")
+                )
+        master_ids.extend(
+            int(master.get("id")) for master in self.xml.iter(f"{{{P_NS}}}sldMasterId")
+        )
+        slide_ids = [
+            int(slide.get("id")) for slide in self.xml.iter(f"{{{P_NS}}}sldId")
+        ]
+        self.next_slide_id = max(slide_ids, default=FIRST_SLIDE_ID - 1) + 1
+        self.next_master_id = max(master_ids) + 1
+        rel_numbers = [
+            int(rel.get("Id")[3:])
+            for rel in self.rels
+            if re.fullmatch(r"rId\d+", rel.get("Id"))
+        ]
+        self.next_rel = max(rel_numbers, default=0) + 1
+        self.sections = next(
+            (
+                element
+                for element in self.xml.iter()
+                if isinstance(element.tag, str) and element.tag.endswith("}sectionLst")
+            ),
+            None,
+        )
+
+    def add_rel(self, rel_type, part):
+        rel_id = f"rId{self.next_rel}"
+        self.next_rel += 1
+        rel = self.rels.makeelement(f"{{{RELS_NS}}}Relationship")
+        rel.set("Id", rel_id)
+        rel.set("Type", rel_type)
+        rel.set("Target", _relative(self.name, part))
+        self.rels.append(rel)
+        return rel_id
+
+    def _list(self, tag):
+        # The list element, created in schema order if missing
+        element = self.xml.find(f"{{{P_NS}}}{tag}")
+        if element is None:
+            element = self.xml.makeelement(f"{{{P_NS}}}{tag}")
+            order = PRESENTATION_LISTS + ("sldIdLst",)
+            before = [
+                self.xml.find(f"{{{P_NS}}}{name}") for name in order[: order.index(tag)]
+            ]
+            before = [found for found in before if found is not None]
+            if before:
+                before[-1].addnext(element)
+            else:
+                self.xml.insert(0, element)
+        return element
+
+    def add_master(self, part, master_xml):
+        # Master and layout ids share one range across the presentation
+        for layout in master_xml.iter(f"{{{P_NS}}}sldLayoutId"):
+            layout.set("id", str(self.next_master_id))
+            self.next_master_id += 1
+        entry = self._list("sldMasterIdLst").makeelement(f"{{{P_NS}}}sldMasterId")
+        entry.set("id", str(self.next_master_id))
+        self.next_master_id += 1
+        entry.set(f"{{{R_NS}}}id", self.add_rel(SLIDE_MASTER, part))
+        self._list("sldMasterIdLst").append(entry)
+
+    def add_single_master(self, rel_type, part):
+        self.masters[rel_type] = part
+        tag = SINGLE_MASTERS[rel_type]
+        element_list = self._list(tag)
+        entry = element_list.makeelement(f"{{{P_NS}}}{tag[:-3]}")
+        entry.set(f"{{{R_NS}}}id", self.add_rel(rel_type, part))
+        element_list.append(entry)
+
+    def add_slide(self, part):
+        entry = self.xml.makeelement(f"{{{P_NS}}}sldId")
+        slide_id = self.next_slide_id
+        self.next_slide_id += 1
+        entry.set("id", str(slide_id))
+        entry.set(f"{{{R_NS}}}id", self.add_rel(SLIDE, part))
+        self._list("sldIdLst").append(entry)
+        return slide_id
+
+    def add_section(self, name, slide_ids):
+        # With sections, every slide must be in one: one section per deck
+        if self.sections is None or not slide_ids:
+            return
+        namespace = self.sections.tag[: -len("sectionLst")]
+        section = self.sections.makeelement(namespace + "section")
+        section.set("name", name)
+        section.set("id", "{%s}" % str(uuid.uuid4()).upper())
+        slide_list = section.makeelement(namespace + "sldIdLst")
+        for slide_id in slide_ids:
+            entry = slide_list.makeelement(namespace + "sldId")
+            entry.set("id", str(slide_id))
+            slide_list.append(entry)
+        section.append(slide_list)
+        self.sections.append(section)
+
+
+def _append_deck(output, presentation, deck):
+    name = deck.package.main_part()
+    deck_xml = deck.package.read_xml(name)
+    _, rels = deck.relationships(name)
+    targets = {rel.get("Id"): target for rel, target in rels}
+
+    # Notes and handout masters: keep the base deck's
+    for rel, target in rels:
+        if presentation.masters.get(rel.get("Type")):
+            deck.mapped[target] = presentation.masters[rel.get("Type")]
+
+    for rel, target in rels:
+        if rel.get("Type") != SLIDE_MASTER:
+            continue
+        key, order = output.design(deck, target)
+        if key in output.designs:
+            for part, existing in zip(order, output.designs[key]):
+                deck.mapped[part] = existing
+            output.masters_reused += 1
+            continue
+        master = output.copy_part(deck, target)
+        output.designs[key] = [deck.mapped[part] for part in order]
+        master_xml = deck.package.read_xml(target)
+        presentation.add_master(master, master_xml)
+        output.replace(master, _serialize_xml(master_xml))
+
+    slide_ids = []
+    for slide in deck.package.slide_ids(deck_xml):
+        target = targets.get(slide.get(f"{{{R_NS}}}id"))
+        if target is None:
+            continue
+        slide_ids.append(presentation.add_slide(output.copy_part(deck, target)))
+
+    # A notes master the base deck didn't have, copied with the notes
+    for rel, target in rels:
+        rel_type = rel.get("Type")
+        if rel_type in SINGLE_MASTERS and not presentation.masters.get(rel_type):
+            if target in deck.mapped:
+                presentation.add_single_master(rel_type, deck.mapped[target])
+
+    base_name = posixpath.splitext(posixpath.basename(deck.path))[0]
+    presentation.add_section(base_name, slide_ids)
+    return len(slide_ids)
+
+
+def merge_decks(input_files, output_file, progress, is_cancelled, metrics=None):
+    metrics = metrics or JobMetrics()
+    decks = []
+    try:
+        base = _Deck(input_files[0])
+        decks.append(base)
+        presentation = _Presentation(base)
+        output = _Output(base)
+        _, rels = base.relationships(presentation.name)
+        for rel, target in rels:
+            if rel.get("Type") == SLIDE_MASTER:
+                key, order = output.design(base, target)
+                output.designs.setdefault(key, order)
+        slides = len(base.package.slide_ids(presentation.xml))
+        metrics.lap("open")
+
+        for path in input_files[1:]:
+            if is_cancelled():
+                raise JobCancelled()
+            deck = _Deck(path)
+            decks.append(deck)
+            slides += _append_deck(output, presentation, deck)
+        metrics.lap("rewrite")
+
+        content_types = base.package.read_xml(CONTENT_TYPES)
+        for extension, content_type in output.defaults.items():
+            default = content_types.makeelement(f"{{{CT_NS}}}Default")
+            default.set("Extension", extension)
+            default.set("ContentType", content_type)
+            content_types.insert(0, default)
+        for part, content_type in output.overrides.items():
+            override = content_types.makeelement(f"{{{CT_NS}}}Override")
+            override.set("PartName", "/" + part)
+            override.set("ContentType", content_type)
+            content_types.append(override)
+
+        rewritten = {
+            presentation.name: _serialize_xml(presentation.xml),
+            rels_name(presentation.name): _serialize_xml(presentation.rels),
+            CONTENT_TYPES: _serialize_xml(content_types),
+        }
+        members = [
+            (base, info, rewritten.get(info.filename), info.filename)
+            for info in base.package.zip.infolist()
+        ] + output.members
+        metrics.lap("rewrite")
+        copying = JobMetrics()
+        with open_output(output_file) as stream:
+            with zipfile.ZipFile(stream, "w", zipfile.ZIP_DEFLATED) as zout:
+                for done, (deck, info, data, name) in enumerate(members, 1):
+                    if is_cancelled():
+                        raise JobCancelled()
+                    if data is not None:
+                        with copying.stage("compress"):
+                            write_member(zout, _renamed(info, name), data)
+                    else:
+                        with copying.stage("write"):
+                            copy_member_raw(deck.file, zout, _renamed(info, name))
+                    progress(done, len(members))
+            bytes_written = stream.tell()
+        metrics.lap("copy")
+        metrics.absorb(copying, within="copy")
+    except KeyError as e:
+        raise JobError(f"Broken presentation: missing part {e}.") from None
+    finally:
+        for deck in decks:
+            deck.close()
+
+    metrics.count("slides", slides)
+    metrics.count("parts", len(members))
+    metrics.count("parts_deduplicated", output.parts_deduplicated)
+    metrics.count("masters_reused", output.masters_reused)
+    metrics.count("bytes_written", bytes_written)
+    return slides
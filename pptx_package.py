@@ -0,0 +1,258 @@
+import copy
+import posixpath
+import struct
+import zipfile
+from core import JobCancelled, JobError
+from metrics import JobMetrics
+from sinks import open_output
+
+# Slide extraction working directly on the PPTX zip (OPC package) instead of
+# python-pptx's object model. Only presentation.xml, its relationships and
+# [Content_Types].xml are parsed and rewritten; every other part that is still
+# reachable is copied byte for byte, without decompressing it.
+
+CONTENT_TYPES = "[Content_Types].xml"
+ROOT_RELS = "_rels/.rels"
+
+RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+CT_NS = "http://schemas.openxmlformats.org/package/2006/content-types"
+P_NS = "http://schemas.openxmlformats.org/presentationml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+OFFICE_DOCUMENT_TYPE = R_NS + "/officeDocument"
+
+# Members are streamed in chunks of this size when copied
+COPY_CHUNK_SIZE = 1024 * 1024
+
+_LOCAL_HEADER_SIZE = 30
+
+
+def rels_name(part_name):
+    directory, base_name = posixpath.split(part_name)
+    return posixpath.join(directory, "_rels", base_name + ".rels")
+
+
+def resolve_target(part_name, target):
+    # Relationship targets are relative to the source part's folder
+    if target.startswith("/"):
+        return target.lstrip("/")
+    base = posixpath.dirname(part_name) if part_name else ""
+    return posixpath.normpath(posixpath.join(base, target))
+
+
+def _parse_xml(data):
+    from lxml import etree
+
+    return etree.fromstring(data)
+
+
+def _serialize_xml(root):
+    from lxml import etree
+
+    return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+class Package:
+    def __init__(self, path):
+        self.path = path
+        self.zip = zipfile.ZipFile(path)
+        self.names = set(self.zip.namelist())
+
+    def close(self):
+        self.zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_xml(self, name):
+        return _parse_xml(self.zip.read(name))
+
+    def relationships(self, part_name):
+        # Internal relationships of a part as (element, target part name)
+        name = rels_name(part_name) if part_name else ROOT_RELS
+        if name not in self.names:
+            return None, []
+        root = self.read_xml(name)
+        rels = []
+        for rel in root.iter(f"{{{RELS_NS}}}Relationship"):
+            if rel.get("TargetMode") == "External":
+                continue
+            rels.append((rel, resolve_target(part_name, rel.get("Target"))))
+        return root, rels
+
+    def main_part(self):
+        _, rels = self.relationships("")
+        for rel, target in rels:
+            if rel.get("Type") == OFFICE_DOCUMENT_TYPE:
+                return target
+        raise JobError("Not a presentation: no main document part.")
+
+    def slide_ids(self, presentation_xml=None):
+        presentation = self.main_part()
+        if presentation_xml is None:
+            presentation_xml = self.read_xml(presentation)
+        slide_list = presentation_xml.find(f"{{{P_NS}}}sldIdLst")
+        if slide_list is None:
+            return []
+        return list(slide_list)
+
+    def reachable_parts(self, overrides):
+        # Walk relationships from the package root. `overrides` maps a part
+        # name to an already parsed (and possibly edited) relationships root.
+        reachable = set()
+        pending = [""]
+        while pending:
+            part_name = pending.pop()
+            if part_name in overrides:
+                root = overrides[part_name]
+                rels = [
+                    (rel, resolve_target(part_name, rel.get("Target")))
+                    for rel in root.iter(f"{{{RELS_NS}}}Relationship")
+                    if rel.get("TargetMode") != "External"
+                ]
+            else:
+                _, rels = self.relationships(part_name)
+            for _, target in rels:
+                if target not in reachable and target in self.names:
+                    reachable.add(target)
+                    pending.append(target)
+        return reachable
+
+
+def copy_member_raw(source, zout, info):
+    # Copy a member's compressed bytes unchanged. zipfile has no public API
+    # for this, so the local header is rebuilt from the ZipInfo and the entry
+    # is registered for the central directory by hand.
+    info = copy.copy(info)
+    source.seek(info.header_offset)
+    header = source.read(_LOCAL_HEADER_SIZE)
+    name_length, extra_length = struct.unpack("<HH", header[26:30])
+    source.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_length + extra_length)
+
+    # Sizes and CRC go in the local header; no trailing data descriptor
+    info.flag_bits &= ~0x08
+    info.extra = b""
+    info.header_offset = zout.fp.tell()
+    zout.fp.write(info.FileHeader())
+
+    remaining = info.compress_size
+    while remaining:
+        chunk = source.read(min(COPY_CHUNK_SIZE, remaining))
+        if not chunk:
+            raise JobError(f"Truncated zip member: {info.filename}")
+        zout.fp.write(chunk)
+        remaining -= len(chunk)
+
+    zout.filelist.append(info)
+    zout.NameToInfo[info.filename] = info
+    zout.start_dir = zout.fp.tell()
+
+
+def write_member(zout, info, data):
+    new_info = zipfile.ZipInfo(info.filename, date_time=info.date_time)
+    new_info.compress_type = zipfile.ZIP_DEFLATED
+    new_info.external_attr = info.external_attr
+    zout.writestr(new_info, data)
+
+
+def slide_count(path):
+    with Package(path) as package:
+        return len(package.slide_ids())
+
+
+def _drop_references(presentation_xml, dropped_rel_ids, dropped_slide_ids):
+    # Custom shows refer to slides by relationship id and PowerPoint 2010
+    # sections by slide id; dangling entries make PowerPoint repair the file
+    for element in list(presentation_xml.iter()):
+        if element.get(f"{{{R_NS}}}id") in dropped_rel_ids:
+            element.getparent().remove(element)
+        elif (
+            isinstance(element.tag, str)
+            and element.tag.endswith("}sldId")
+            and element.get("id") in dropped_slide_ids
+        ):
+            element.getparent().remove(element)
+
+
+def extract_slides(
+    input_file, output_file, slide_indices, progress, is_cancelled, metrics=None
+):
+    metrics = metrics or JobMetrics()
+    with Package(input_file) as package:
+        presentation = package.main_part()
+        presentation_xml = package.read_xml(presentation)
+        slides = package.slide_ids(presentation_xml)
+        metrics.lap("open")
+
+        for index in slide_indices:
+            if index < 0 or index >= len(slides):
+                raise JobError(
+                    f"Slide {index + 1} is out of bounds. "
+                    f"Presentation has {len(slides)} slides."
+                )
+
+        # Rebuild the slide list in the requested order
+        keep = []
+        for index in slide_indices:
+            if slides[index] not in keep:
+                keep.append(slides[index])
+        slide_list = slides[0].getparent() if slides else None
+        for slide in slides:
+            slide_list.remove(slide)
+        for slide in keep:
+            slide_list.append(slide)
+
+        dropped = [slide for slide in slides if slide not in keep]
+        dropped_rel_ids = {slide.get(f"{{{R_NS}}}id") for slide in dropped}
+        dropped_slide_ids = {slide.get("id") for slide in dropped}
+        _drop_references(presentation_xml, dropped_rel_ids, dropped_slide_ids)
+
+        presentation_rels, _ = package.relationships(presentation)
+        for rel in list(presentation_rels):
+            if rel.get("Id") in dropped_rel_ids:
+                presentation_rels.remove(rel)
+
+        # Everything no longer reachable (dropped slides, their notes and
+        # media nobody else uses) is left out of the output
+        kept = package.reachable_parts({presentation: presentation_rels})
+        kept.update(rels_name(name) for name in list(kept))
+        kept.update((CONTENT_TYPES, ROOT_RELS))
+
+        content_types = package.read_xml(CONTENT_TYPES)
+        for override in list(content_types.iter(f"{{{CT_NS}}}Override")):
+            if override.get("PartName").lstrip("/") not in kept:
+                content_types.remove(override)
+
+        rewritten = {
+            presentation: _serialize_xml(presentation_xml),
+            rels_name(presentation): _serialize_xml(presentation_rels),
+            CONTENT_TYPES: _serialize_xml(content_types),
+        }
+
+        members = [info for info in package.zip.infolist() if info.filename in kept]
+        metrics.lap("rewrite")
+        copying = JobMetrics()
+        with open(input_file, "rb") as source, open_output(output_file) as output:
+            # Streams that can't seek get data descriptors after each part
+            with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as zout:
+                for done, info in enumerate(members, 1):
+                    if is_cancelled():
+                        raise JobCancelled()
+                    if info.filename in rewritten:
+                        # Rewritten parts are compressed again
+                        with copying.stage("compress"):
+                            write_member(zout, info, rewritten[info.filename])
+                    else:
+                        with copying.stage("write"):
+                            copy_member_raw(source, zout, info)
+                    progress(done, len(members))
+            bytes_written = output.tell()
+        metrics.lap("copy")
+        metrics.absorb(copying, within="copy")
+
+    metrics.count("slides", len(keep))
+    metrics.count("parts", len(members))
+    metrics.count("bytes_written", bytes_written)
+    return len(keep)
@@ -0,0 +1,124 @@
+import re
+from itertools import chain
+
+# Page and slide selections. A selection is kept as a list of Python ranges
+# (runs) in the order they were given, never expanded into one entry per
+# page, so parsing and validating "1-100000" costs the same as "1-2".
+#
+# Syntax, comma separated, numbers starting at 1:
+#   5          a single page
+#   1-10       a range; "10-1" gives the same pages in reverse order
+#   100-  -20  open ends: to the last page, from the first page
+#   1-20:2     every second page of a range
+#   odd  even  odd or even pages of the whole document
+#   !5-7       leave pages out of everything selected before it; a
+#              selection starting with an exclusion starts from all pages
+
+_TERM = re.compile(r"^(\d*)(-?)(\d*)(?::(\d+))?$")
+
+
+class RangeError(ValueError):
+    pass
+
+
+class PageSelection:
+    def __init__(self, runs):
+        self.runs = [run for run in runs if run]
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def __iter__(self):
+        return chain.from_iterable(self.runs)
+
+    def __repr__(self):
+        return f"PageSelection({self.runs!r})"
+
+
+def parse_selection(spec, total, item="page", document="PDF"):
+    # Returns a PageSelection of 0-based indices. `item` and `document` only
+    # word the error messages ("Slide 9 is out of bounds. Presentation ...").
+    runs = []
+    for index, part in enumerate(spec.split(",")):
+        term = part.replace(" ", "").lower()
+        if term.startswith("!"):
+            start, stop = _parse_exclusion(term[1:], part, total, item, document)
+            if index == 0:
+                runs = [range(total)]
+            runs = [piece for run in runs for piece in _subtract(run, start, stop)]
+        else:
+            runs.append(_parse_term(term, part, total, item, document))
+    return PageSelection(runs)
+
+
+def range_label(spec):
+    # The selection as used in output file names: "1-3, 5" gives "1-3-5"
+    label = spec.replace(" ", "").replace(",", "-")
+    return re.sub(r"[^0-9A-Za-z-]+", "_", label)
+
+
+def _parse_term(term, part, total, item, document):
+    if term in ("odd", "even"):
+        return range(0 if term == "odd" else 1, total, 2)
+
+    match = _TERM.match(term)
+    if not match or not (match.group(1) or match.group(3) or match.group(2)):
+        raise RangeError(f"Invalid {item} range: {part.strip()!r}.")
+    first, dash, last, step = match.groups()
+    step = int(step) if step else 1
+    if step < 1:
+        raise RangeError(f"Invalid {item} range: the step in {part.strip()!r} is 0.")
+
+    if not dash:
+        number = int(first)
+        _check_bounds(number, number, total, item, document)
+        return range(number - 1, number)
+
+    start = int(first) if first else 1
+    end = int(last) if last else total
+    _check_bounds(start, end, total, item, document)
+    if start > end:
+        return range(start - 1, end - 2, -step)
+    return range(start - 1, end, step)
+
+
+def _parse_exclusion(term, part, total, item, document):
+    # Exclusions take a single page or a plain range: [start, stop) 0-based
+    if term in ("odd", "even") or ":" in term:
+        raise RangeError(
+            f"Invalid {item} range: {part.strip()!r}. "
+            f"Exclusions take a {item} or a range without a step."
+        )
+    run = _parse_term(term, part, total, item, document)
+    if run.step < 0:
+        run = run[::-1]
+    return run.start, run.stop
+
+
+def _check_bounds(start, end, total, item, document):
+    if 1 <= start <= total and 1 <= end <= total:
+        return
+    if start == end:
+        raise RangeError(
+            f"{item.capitalize()} {start} is out of bounds. "
+            f"{document} has {total} {item}s."
+        )
+    raise RangeError(
+        f"{item.capitalize()} range {start}-{end} is out of bounds. "
+        f"{document} has {total} {item}s."
+    )
+
+
+def _subtract(run, start, stop):
+    # The parts of a run outside [start, stop), in the run's own order
+    if run.step < 0:
+        return [piece[::-1] for piece in reversed(_subtract(run[::-1], start, stop))]
+    first = _first_index_at_least(run, start)
+    last = max(first, _first_index_at_least(run, stop))
+    return [piece for piece in (run[:first], run[last:]) if piece]
+
+
+def _first_index_at_least(run, value):
+    if value <= run.start:
+        return 0
+    return min(len(run), -(-(value - run.start) // run.step))
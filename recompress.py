@@ -0,0 +1,279 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from time import perf_counter
+from memory import resolve
+from metrics import JobMetrics
+from PyPDF2.generic import (
+    ArrayObject,
+    DictionaryObject,
+    IndirectObject,
+    NameObject,
+    NumberObject,
+    StreamObject,
+)
+
+# Optional downsampling of images in PDF output, e.g. 600 dpi scans archived
+# at 150 dpi. Image XObjects above the target resolution are decoded, resized
+# and encoded as JPEG in a process pool while the writer copies the pages in
+# front of them. An image's resolution is taken from its page's MediaBox: it
+# is assumed to fill at most the page, so the estimate is never higher than
+# the real resolution and images are never made smaller than the target.
+#
+# Images are keyed by their encoded bytes and target size: the same image on
+# many pages, in several split outputs or in several merged inputs is
+# recompressed once. An image whose JPEG would not be smaller is kept as is,
+# and so is anything Pillow can't decode or JPEG can't hold (masks, CMYK,
+# indexed colors, 16-bit samples, JBIG2 and CCITT scans).
+
+DEFAULT_QUALITY = 75
+
+# Results kept after their last reference is written
+FINISHED_IMAGES = 64
+
+
+# Color spaces JPEG holds as they are, by number of components
+COMPONENTS = {"/DeviceGray": 1, "/CalGray": 1, "/DeviceRGB": 3, "/CalRGB": 3}
+MODES = {1: "L", 3: "RGB"}
+
+# Filters undone before Pillow reads the samples; /DCTDecode may come last
+DECODE_FILTERS = ("/ASCIIHexDecode", "/ASCII85Decode", "/LZWDecode", "/FlateDecode")
+
+# Keys describing the encoded data; the JPEG gets its own
+REPLACED_KEYS = ("/Filter", "/DecodeParms", "/Width", "/Height", "/BitsPerComponent")
+
+
+def _components(color_space):
+    color_space = color_space.get_object() if color_space is not None else None
+    if isinstance(color_space, ArrayObject) and color_space:
+        family = color_space[0]
+        if family == "/ICCBased":
+            components = color_space[1].get_object().get("/N")
+            return components if components in MODES else None
+        return COMPONENTS.get(family)
+    return COMPONENTS.get(color_space)
+
+
+def _image_job(image):
+    # (filter, decode parameters, width, height, components) for an image
+    # that can be recompressed, or None
+    if image.get("/ImageMask") or "/Decode" in image:
+        return None
+    if isinstance(image.get("/Mask"), ArrayObject):
+        return None  # Color key masks need exact colors
+    filters = _as_list(image.get("/Filter"))
+    is_jpeg = filters[-1:] == ["/DCTDecode"]
+    if any(name not in DECODE_FILTERS for name in filters[: -1 if is_jpeg else None]):
+        return None
+    if not is_jpeg and image.get("/BitsPerComponent") != 8:
+        return None
+    components = _components(image.get("/ColorSpace"))
+    if components is None:
+        return None
+
+    # Decode parameters as plain dicts, one per filter, for the worker
+    parms = [
+        (
+            {str(key): int(value.get_object()) for key, value in parm.items()}
+            if isinstance(parm, DictionaryObject)
+            else None
+        )
+        for parm in _as_list(image.get("/DecodeParms"))
+    ]
+    parms += [None] * (len(filters) - len(parms))
+    width, height = int(image["/Width"]), int(image["/Height"])
+    return filters, parms, width, height, components
+
+
+def _as_list(value):
+    # /Filter and /DecodeParms hold one entry or an array of them
+    if value is None:
+        return []
+    value = value.get_object()
+    if isinstance(value, ArrayObject):
+        return [item.get_object() for item in value]
+    return [value]
+
+
+def target_size(width, height, page_width, page_height, dpi):
+    # Pixel size at `dpi`, or None if the image isn't above it. The image is
+    # turned to the page's orientation and assumed to fill at most the page.
+    if (width >= height) != (page_width >= page_height):
+        page_width, page_height = page_height, page_width
+    resolution = min(width * 72 / page_width, height * 72 / page_height)
+    if resolution <= dpi:
+        return None
+    scale = dpi / resolution
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def recompress_image(data, filters, parms, width, height, components, size, quality):
+    # Runs in a worker process. JPEG bytes of the resized image, or None if
+    # the image can't be decoded or wouldn't get smaller.
+    from PIL import Image
+    from PyPDF2 import filters as pdf_filters
+
+    decoders = {
+        "/ASCIIHexDecode": pdf_filters.ASCIIHexDecode,
+        "/ASCII85Decode": pdf_filters.ASCII85Decode,
+        "/LZWDecode": pdf_filters.LZWDecode,
+        "/FlateDecode": pdf_filters.FlateDecode,
+    }
+    mode = MODES[components]
+    encoded_size = len(data)
+    try:
+        for name, parm in zip(filters, parms):
+            if name == "/DCTDecode":
+                break
+            data = decoders[name].decode(data, parm)
+        if filters[-1:] == ["/DCTDecode"]:
+            image = Image.open(BytesIO(data))
+            # libjpeg decodes straight to 1/2, 1/4 or 1/8 of the size
+            image.draft(mode, size)
+            if image.mode != mode:
+                return None
+        else:
+            image = Image.frombytes(mode, (width, height), data)
+        image = image.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+        output = BytesIO()
+        image.save(output, "JPEG", quality=quality, optimize=True)
+    except Exception:
+        return None
+    data = output.getvalue()
+    return data if len(data) < encoded_size else None
+
+
+def _page_images(page, guard=None):
+    # The images a page draws, through form XObjects, as (reference, image).
+    # Objects are loaded through the guard (see memory.MemoryGuard) if any.
+    images = []
+    seen = set()
+    pending = [page]
+    while pending:
+        resources = pending.pop().get("/Resources")
+        resources = resolve(resources, guard) if resources is not None else {}
+        xobjects = resources.get("/XObject")
+        xobjects = resolve(xobjects, guard) if xobjects is not None else {}
+        for ref in xobjects.values():
+            if not isinstance(ref, IndirectObject) or ref.idnum in seen:
+                continue
+            seen.add(ref.idnum)
+            xobject = resolve(ref, guard)
+            if xobject.get("/Subtype") == "/Image":
+                images.append((ref, xobject))
+            elif xobject.get("/Subtype") == "/Form":
+                pending.append(xobject)
+    return images
+
+
+class ImageRecompressor:
+    def __init__(self, dpi, quality=DEFAULT_QUALITY, workers=None):
+        from batch import default_workers
+
+        self.dpi = dpi
+        self.quality = quality
+        self.pool = ProcessPoolExecutor(max_workers=workers or default_workers())
+        # Several writers (split outputs) may share one recompressor
+        self.lock = threading.Lock()
+        # Key -> [future, references not yet written]
+        self.pending = {}
+        # The last results written, for images that come up again
+        self.finished = OrderedDict()
+        self.started = perf_counter()
+        self.metrics = JobMetrics()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self.pending.clear()
+        self.finished.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def images_per_second(self):
+        elapsed = perf_counter() - self.started
+        return round(self.metrics.counters["images_recompressed"] / elapsed, 1)
+
+    def queue(self, source, pages):
+        # Start recompressing the images of pages about to be written
+        with source.lock:
+            for page in pages:
+                box = page.mediabox
+                page_width, page_height = float(box.width), float(box.height)
+                if page_width <= 0 or page_height <= 0:
+                    continue
+                for ref, image in _page_images(page, source.guard):
+                    # Each image once per source, and not after it's written
+                    if ref.idnum in source.images or ref.idnum in source.object_map:
+                        continue
+                    source.images[ref.idnum] = self._submit(
+                        image, page_width, page_height
+                    )
+
+    def _submit(self, image, page_width, page_height):
+        job = _image_job(image)
+        if job is None:
+            return None
+        _, _, width, height, _ = job
+        size = target_size(width, height, page_width, page_height, self.dpi)
+        if size is None:
+            return None
+
+        data = image._data
+        key = (hashlib.blake2b(data, digest_size=16).digest(), size)
+        with self.lock:
+            if key in self.finished:
+                # Written before, e.g. by an earlier input of a merge
+                self.pending[key] = [self.finished.pop(key), 0]
+            elif key not in self.pending:
+                future = self.pool.submit(
+                    recompress_image, data, *job, size, self.quality
+                )
+                future.counted = False
+                self.pending[key] = [future, 0]
+            self.pending[key][1] += 1
+        return key
+
+    def replace(self, source, idnum, obj):
+        # The object to write in place of a source image: a JPEG version if
+        # one was queued and came out smaller, otherwise the image itself
+        key = source.images.pop(idnum, None)
+        if key is None:
+            return obj
+        with self.lock:
+            future, references = self.pending[key]
+            if references == 1:
+                del self.pending[key]
+                self.finished[key] = future
+                if len(self.finished) > FINISHED_IMAGES:
+                    self.finished.popitem(last=False)
+            else:
+                self.pending[key][1] -= 1
+        with self.metrics.stage("images"):
+            data = future.result()
+        if data is None:
+            return obj
+        with self.lock:
+            if not future.counted:
+                # Counted once per distinct image
+                future.counted = True
+                self.metrics.count("images_recompressed")
+                self.metrics.count("image_bytes_saved", len(obj._data) - len(data))
+
+        width, height = key[1]
+        image = StreamObject()
+        for name, value in obj.items():
+            if name not in REPLACED_KEYS:
+                image[name] = value
+        image[NameObject("/Filter")] = NameObject("/DCTDecode")
+        image[NameObject("/Width")] = NumberObject(width)
+        image[NameObject("/Height")] = NumberObject(height)
+        image[NameObject("/BitsPerComponent")] = NumberObject(8)
+        image._data = data
+        return image
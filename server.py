@@ -0,0 +1,501 @@
+import json
+import os
+import signal
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from email.parser import HeaderParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from batch import default_workers
+from core import (
+    JobError,
+    extract_pages,
+    extract_slides,
+    merge_pdfs,
+    merge_presentations,
+)
+from metrics import logger
+from ranges import range_label
+
+# HTTP service mode, for web apps that need the operations without the
+# window:
+#
+#   POST /extract?pages=1-3     one PDF              -> PDF
+#   POST /slides?slides=2-4     one PPTX             -> PPTX
+#   POST /merge                 PDFs, in order       -> PDF
+#   POST /merge-slides          PPTX files, in order -> PPTX
+#   GET  /metrics               request latency and queue depth, as JSON
+#   GET  /health
+#
+# Documents are sent as multipart/form-data (files in order; "pages" and
+# "slides" may also be form fields) or as the raw request body for a single
+# document. Uploads are streamed to a temporary folder as they arrive and the
+# result is sent back from disk, so neither is ever held in memory. The job
+# result (pages, output_bytes, elapsed) is in the X-Splitter-Result header.
+#
+# Jobs run on a process pool of `workers`, and at most `queue_size` more
+# requests wait for one. Beyond that, requests are refused with 503 and
+# Retry-After before their body is read, so a burst can't fill the disk or
+# pile up latency.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+
+# Requests admitted beyond the number of workers
+QUEUE_SIZE = 16
+
+# Largest accepted request body
+MAX_UPLOAD_BYTES = 2 * 1024 * 1024 * 1024
+
+# Form fields other than files are parameters and kept in memory
+MAX_FIELD_SIZE = 64 * 1024
+MAX_PART_HEADERS = 16 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+
+# Seconds a refused client is told to wait
+RETRY_AFTER = 1
+
+# Latencies kept per endpoint for the percentiles
+LATENCY_SAMPLES = 1000
+
+# operation: (input and output extension, parameter, output suffix)
+OPERATIONS = {
+    "extract": (".pdf", "pages", "pages"),
+    "slides": (".pptx", "slides", "slides"),
+    "merge": (".pdf", None, "merged"),
+    "merge-slides": (".pptx", None, "merged"),
+}
+
+MEDIA_TYPES = {
+    ".pdf": "application/pdf",
+    ".pptx": "application/vnd.openxmlformats-officedocument.presentationml"
+    ".presentation",
+}
+
+
+def _run_job(operation, input_files, output_file, parameter):
+    # Runs in a worker process. Every upload is a new file, so nothing is
+    # kept in the document cache.
+    if operation == "extract":
+        return extract_pages(input_files[0], output_file, parameter, cached=False)
+    if operation == "slides":
+        return extract_slides(input_files[0], output_file, parameter, cached=False)
+    if operation == "merge":
+        return merge_pdfs(input_files, output_file)
+    return merge_presentations(input_files, output_file)
+
+
+def _ignore_interrupts():
+    # Ctrl+C reaches the whole process group; only the parent handles it
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class BodyReader:
+    # Reads a request body of known length in chunks
+    def __init__(self, stream, length):
+        self.stream = stream
+        self.remaining = length
+
+    def read(self, size=CHUNK_SIZE):
+        if not self.remaining:
+            return b""
+        data = self.stream.read(min(size, self.remaining))
+        if not data:
+            raise RequestError(400, "The upload ended early.")
+        self.remaining -= len(data)
+        return data
+
+
+class _Part:
+    # Where one multipart part goes: a file for uploads, memory for fields
+    def __init__(self, headers, directory, index, extension):
+        message = HeaderParser().parsestr(headers)
+        self.name = message.get_param("name", header="content-disposition")
+        self.filename = message.get_param("filename", header="content-disposition")
+        self.path = None
+        self.data = bytearray()
+        if self.filename is not None:
+            suffix = os.path.splitext(self.filename)[1].lower()
+            suffix = suffix if suffix in MEDIA_TYPES else extension
+            self.path = os.path.join(directory, f"input{index}{suffix}")
+            self.file = open(self.path, "wb")
+
+    def write(self, data):
+        if self.path is not None:
+            self.file.write(data)
+            return
+        self.data += data
+        if len(self.data) > MAX_FIELD_SIZE:
+            raise RequestError(413, f"Form field {self.name!r} is too large.")
+
+    def close(self):
+        if self.path is not None:
+            self.file.close()
+
+
+def read_multipart(body, boundary, directory, extension):
+    # Streams a multipart/form-data body: files to `directory`, in order, and
+    # form fields into a dict. Returns (fields, file paths, file names as
+    # sent by the client).
+    delimiter = b"\r\n--" + boundary
+    # The body starts with the boundary without the line break before it
+    buffer = bytearray(b"\r\n")
+    fields, files, names = {}, [], []
+    part = None
+    try:
+        while True:
+            index = buffer.find(delimiter)
+            if index < 0:
+                # All but what could be the start of a delimiter is data
+                keep = len(delimiter) - 1
+                if len(buffer) > keep:
+                    if part is not None:
+                        part.write(buffer[:-keep])
+                    del buffer[:-keep]
+                data = body.read()
+                if not data:
+                    raise RequestError(400, "The multipart body is not terminated.")
+                buffer += data
+                continue
+
+            if part is not None:
+                part.write(buffer[:index])
+                part.close()
+                if part.path is not None:
+                    files.append(part.path)
+                    names.append(part.filename)
+                elif part.name:
+                    fields[part.name] = part.data.decode("utf-8", "replace")
+                part = None
+            del buffer[: index + len(delimiter)]
+
+            # "--" after the boundary ends the body; otherwise part headers
+            while len(buffer) < 2:
+                data = body.read()
+                if not data:
+                    raise RequestError(400, "The multipart body is not terminated.")
+                buffer += data
+            if buffer[:2] == b"--":
+                return fields, files, names
+            while (end := buffer.find(b"\r\n\r\n")) < 0:
+                data = body.read()
+                if not data or len(buffer) > MAX_PART_HEADERS:
+                    raise RequestError(400, "Malformed multipart headers.")
+                buffer += data
+            headers = buffer[2:end].decode("utf-8", "replace")
+            del buffer[: end + 4]
+            part = _Part(headers, directory, len(files), extension)
+    finally:
+        if part is not None:
+            part.close()
+
+
+class LatencyStats:
+    def __init__(self):
+        self.requests = 0
+        self.statuses = Counter()
+        self.total = 0.0
+        self.samples = deque(maxlen=LATENCY_SAMPLES)
+
+    def record(self, status, seconds):
+        self.requests += 1
+        self.statuses[str(status)] += 1
+        self.total += seconds
+        self.samples.append(seconds)
+
+    def as_dict(self):
+        samples = sorted(self.samples)
+
+        def percentile(fraction):
+            if not samples:
+                return None
+            return round(
+                samples[min(len(samples) - 1, int(len(samples) * fraction))], 6
+            )
+
+        return {
+            "requests": self.requests,
+            "statuses": dict(self.statuses),
+            "mean": round(self.total / self.requests, 6) if self.requests else None,
+            "p50": percentile(0.5),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+            "max": round(samples[-1], 6) if samples else None,
+        }
+
+
+class SplitterService:
+    def __init__(self, workers=None, queue_size=QUEUE_SIZE):
+        self.workers = workers or default_workers()
+        self.queue_size = queue_size
+        self.pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_ignore_interrupts
+        )
+        # Requests being uploaded, waiting for a worker or running
+        self.slots = threading.BoundedSemaphore(self.workers + queue_size)
+        self.lock = threading.Lock()
+        self.admitted = 0
+        self.rejected = 0
+        self.jobs = set()
+        self.latency = {operation: LatencyStats() for operation in OPERATIONS}
+        self.started = time.time()
+
+    def close(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+    def admit(self):
+        if not self.slots.acquire(blocking=False):
+            with self.lock:
+                self.rejected += 1
+            return False
+        with self.lock:
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self.lock:
+            self.admitted -= 1
+        self.slots.release()
+
+    def run(self, operation, input_files, output_file, parameter):
+        future = self.pool.submit(
+            _run_job, operation, input_files, output_file, parameter
+        )
+        with self.lock:
+            self.jobs.add(future)
+        try:
+            return future.result()
+        finally:
+            with self.lock:
+                self.jobs.discard(future)
+
+    def record(self, operation, status, seconds):
+        with self.lock:
+            self.latency[operation].record(status, seconds)
+
+    def metrics(self):
+        with self.lock:
+            running = sum(1 for future in self.jobs if future.running())
+            return {
+                "ok": True,
+                "operation": "serve",
+                "uptime": round(time.time() - self.started, 3),
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.admitted,
+                "running": running,
+                "queued": len(self.jobs) - running,
+                "uploading": self.admitted - len(self.jobs),
+                "rejected": self.rejected,
+                "endpoints": {
+                    operation: stats.as_dict()
+                    for operation, stats in self.latency.items()
+                },
+            }
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    server_version = "Splitter"
+    # Keep-alive, so load tests measure jobs rather than connection setup
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug("%s %s", self.address_string(), format % args)
+
+    def send_json(self, status, body, headers=()):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics":
+            self.send_json(200, self.service.metrics())
+        elif path == "/health":
+            self.send_json(200, {"ok": True})
+        else:
+            self.send_json(404, {"ok": False, "error": f"No such endpoint: {path}"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        operation = url.path.strip("/")
+        if operation not in OPERATIONS:
+            self.close_connection = True
+            self.send_json(404, {"ok": False, "error": f"No such endpoint: {url.path}"})
+            return
+
+        started = time.perf_counter()
+        if not self.service.admit():
+            # Refused before reading the body, so the connection can't be
+            # reused
+            self.close_connection = True
+            self.send_json(
+                503,
+                {"ok": False, "error": "The server is busy. Try again later."},
+                [("Retry-After", str(RETRY_AFTER))],
+            )
+            self.service.record(operation, 503, time.perf_counter() - started)
+            return
+
+        try:
+            status = self.handle_job(operation, parse_qs(url.query))
+        finally:
+            self.service.release()
+        self.service.record(operation, status, time.perf_counter() - started)
+
+    def handle_job(self, operation, query):
+        # Returns the response status for the metrics
+        try:
+            with tempfile.TemporaryDirectory(prefix="splitter-") as directory:
+                fields, input_files, names = self.read_inputs(operation, directory)
+                parameter = self.parameter(operation, query, fields)
+                extension = OPERATIONS[operation][0]
+                output_file = os.path.join(directory, "output" + extension)
+                result = self.service.run(
+                    operation, input_files, output_file, parameter
+                )
+                self.send_output(operation, output_file, result, names, parameter)
+                return 200
+        except RequestError as e:
+            status, error = e.status, str(e)
+        except JobError as e:
+            status, error = 400, str(e)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+            return 499  # The client went away
+        except Exception as e:
+            status, error = 500, f"An error occurred: {e}"
+
+        # The body may be partly unread
+        self.close_connection = True
+        self.send_json(status, {"ok": False, "operation": operation, "error": error})
+        return status
+
+    def read_inputs(self, operation, directory):
+        if "Content-Length" not in self.headers:
+            raise RequestError(411, "Content-Length is required.")
+        length = int(self.headers["Content-Length"])
+        if length > MAX_UPLOAD_BYTES:
+            raise RequestError(413, "The upload is too large.")
+        body = BodyReader(self.rfile, length)
+        extension = OPERATIONS[operation][0]
+
+        content_type = self.headers.get_content_type()
+        if content_type == "multipart/form-data":
+            boundary = self.headers.get_param("boundary")
+            if not boundary:
+                raise RequestError(400, "The multipart boundary is missing.")
+            fields, input_files, names = read_multipart(
+                body, boundary.encode("latin-1"), directory, extension
+            )
+        else:
+            # A single document as the raw body
+            fields, input_files = {}, [os.path.join(directory, "input0" + extension)]
+            with open(input_files[0], "wb") as f:
+                while data := body.read():
+                    f.write(data)
+            names = []
+
+        if not input_files:
+            raise RequestError(400, "No documents were uploaded.")
+        if OPERATIONS[operation][1] and len(input_files) != 1:
+            raise RequestError(400, f"{operation} takes exactly one document.")
+        return fields, input_files, names
+
+    def parameter(self, operation, query, fields):
+        name = OPERATIONS[operation][1]
+        if name is None:
+            return None
+        value = fields.get(name) or query.get(name, [None])[0]
+        if not value:
+            raise RequestError(400, f'The "{name}" parameter is required.')
+        return value
+
+    def send_output(self, operation, output_file, result, names, parameter):
+        # Named like the command line's outputs: report_pages_1-3.pdf
+        extension, _, suffix = OPERATIONS[operation]
+        if parameter is not None:
+            suffix = f"{suffix}_{range_label(parameter)}"
+        base_name = os.path.splitext(os.path.basename(names[0]))[0] if names else ""
+        filename = f"{base_name or 'document'}_{suffix}{extension}".replace('"', "")
+        summary = {key: result[key] for key in ("pages", "output_bytes", "elapsed")}
+
+        self.send_response(200)
+        self.send_header("Content-Type", MEDIA_TYPES[extension])
+        self.send_header("Content-Length", str(os.path.getsize(output_file)))
+        self.send_header("Content-Disposition", f'attachment; filename="{filename}"')
+        self.send_header("X-Splitter-Result", json.dumps(summary))
+        self.end_headers()
+        with open(output_file, "rb") as f:
+            self.connection.sendfile(f)
+
+
+class SplitterServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Connections waiting to be accepted; admission control is per request
+    request_queue_size = 128
+
+    def __init__(self, address, service):
+        super().__init__(address, RequestHandler)
+        self.service = service
+
+
+def serve(
+    host=DEFAULT_HOST,
+    port=DEFAULT_PORT,
+    workers=None,
+    queue_size=QUEUE_SIZE,
+    on_ready=None,
+):
+    # Runs until SIGINT or SIGTERM, then returns a summary
+    service = SplitterService(workers, queue_size)
+    try:
+        server = SplitterServer((host, port), service)
+    except OSError as e:
+        service.close()
+        raise JobError(f"Can't listen on {host}:{port}: {e.strerror}.")
+
+    def stop(*args):
+        # shutdown() waits for serve_forever(), which runs on this thread
+        threading.Thread(target=server.shutdown).start()
+
+    handlers = {
+        signum: signal.signal(signum, stop)
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    started = time.perf_counter()
+    try:
+        if on_ready:
+            host, port = server.server_address[:2]
+            on_ready({"ok": True, "operation": "serve", "url": f"http://{host}:{port}"})
+        server.serve_forever()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+        server.server_close()
+        service.close()
+
+    summary = service.metrics()
+    summary["elapsed"] = round(time.perf_counter() - started, 6)
+    return summary
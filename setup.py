@@ -1,5 +1,8 @@
 import PyInstaller.__main__
+import hashlib
+import json
 import os
+import zipfile
 
 # Get the absolute path of the current directory
 current_dir = os.path.abspath(os.path.dirname(__file__))
@@ -16,3 +19,45 @@ PyInstaller.__main__.run(
         "--noconfirm",
     ]
 )
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Release assets: Splitter.zip, the per-file manifest the app uses for delta
+# updates (see updater.py), and a checksum for each. The manifest is also
+# installed with the app, so the next update knows which files it put there.
+dist_dir = os.path.join(current_dir, "dist")
+app_dir = os.path.join(dist_dir, "Splitter")
+manifest_path = os.path.join(dist_dir, "manifest.json")
+
+files = {}
+for root, _, names in os.walk(app_dir):
+    for name in sorted(names):
+        path = os.path.join(root, name)
+        relative = os.path.relpath(path, app_dir).replace(os.sep, "/")
+        if relative != "manifest.json":
+            files[relative] = {
+                "sha256": file_sha256(path),
+                "size": os.path.getsize(path),
+            }
+
+with open(manifest_path, "w") as f:
+    json.dump({"files": files}, f, indent=1, sort_keys=True)
+
+release_zip = os.path.join(dist_dir, "Splitter.zip")
+with zipfile.ZipFile(release_zip, "w", zipfile.ZIP_DEFLATED) as zip_file:
+    for relative in sorted(files):
+        zip_file.write(
+            os.path.join(app_dir, *relative.split("/")), "Splitter/" + relative
+        )
+    zip_file.write(manifest_path, "Splitter/manifest.json")
+
+for path in (release_zip, manifest_path):
+    with open(path + ".sha256", "w") as f:
+        f.write(f"{file_sha256(path)}  {os.path.basename(path)}\n")
@@ -0,0 +1,142 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+
+# Destinations for job output. open_output() takes:
+#
+#   a path      written to a hidden temporary file in the same folder, then
+#               renamed over the path in one step once complete, so readers
+#               never see a partial file and a failed job leaves nothing
+#   "-"         standard output, e.g. to pipe a PDF into another tool
+#   a stream    any object with a binary write() (pipe, socket.makefile,
+#               BytesIO); it is flushed but not closed
+#
+# All of them are written through a large buffer: writers produce many
+# small writes.
+
+OUTPUT_BUFFER_SIZE = 1024 * 1024
+
+STDOUT = "-"
+
+
+class StreamSink:
+    # Collects writes into blocks of buffer_size for a stream. Tracks its own
+    # position, since pipes and sockets can't tell().
+    def __init__(self, stream, buffer_size=OUTPUT_BUFFER_SIZE):
+        self.stream = stream
+        self.buffer_size = buffer_size
+        self.buffer = bytearray()
+        self.position = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.position += len(data)
+        if len(self.buffer) >= self.buffer_size:
+            self.stream.write(self.buffer)
+            self.buffer.clear()
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        if self.buffer:
+            self.stream.write(self.buffer)
+            self.buffer.clear()
+        if hasattr(self.stream, "flush"):
+            self.stream.flush()
+
+
+def is_path(target):
+    return isinstance(target, (str, os.PathLike)) and target != STDOUT
+
+
+def output_name(target):
+    # How an output is reported in job results
+    if is_path(target):
+        return os.path.abspath(target)
+    return STDOUT if target == STDOUT else "<stream>"
+
+
+def temp_path(path):
+    # Hidden, in the same folder (so the rename can't cross file systems),
+    # and unique per thread so concurrent jobs never share one
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+@contextmanager
+def open_output(target, buffer_size=OUTPUT_BUFFER_SIZE, staged=None):
+    # With a StagedOutputs, a completed path is not renamed into place but
+    # handed to it, so several outputs can appear together
+    if not is_path(target):
+        stream = sys.stdout.buffer if target == STDOUT else target
+        sink = StreamSink(stream, buffer_size)
+        yield sink
+        sink.flush()
+        return
+
+    temp_file = temp_path(target)
+    try:
+        with open(temp_file, "wb", buffering=buffer_size) as output:
+            yield output
+            # On disk before the rename, so a crash can't leave an empty
+            # file under the final name
+            output.flush()
+            os.fsync(output.fileno())
+        if staged is not None:
+            staged.add(temp_file, target)
+        else:
+            os.replace(temp_file, target)
+    except BaseException:
+        try:
+            os.remove(temp_file)
+        except OSError:
+            pass
+        raise
+
+
+class StagedOutputs:
+    # Completed outputs of a multi-output job, still under their temporary
+    # names. publish() renames them all into place; discard() removes them
+    # and leaves whatever was at the final paths untouched.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.files = []
+
+    def add(self, temp_file, target):
+        with self.lock:
+            self.files.append((temp_file, target))
+
+    def publish(self):
+        for temp_file, target in self.files:
+            os.replace(temp_file, target)
+        self.files = []
+
+    def discard(self):
+        for temp_file, _ in self.files:
+            try:
+                os.remove(temp_file)
+            except OSError:
+                pass
+        self.files = []
+
+
+@contextmanager
+def open_append(path, expected_size, buffer_size=OUTPUT_BUFFER_SIZE):
+    # Appends to an existing file in place (see incremental). If the job
+    # fails the file is cut back to expected_size, so it never ends in a
+    # partial update.
+    with open(path, "r+b", buffering=0) as output:
+        if output.seek(0, os.SEEK_END) != expected_size:
+            raise OSError(f"{path} changed while it was being read")
+        sink = StreamSink(output, buffer_size)
+        try:
+            yield sink
+            sink.flush()
+            os.fsync(output.fileno())
+        except BaseException:
+            # Whatever is still buffered is dropped with the rest
+            output.truncate(expected_size)
+            raise
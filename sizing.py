@@ -0,0 +1,157 @@
+import os
+from collections import Counter
+from memory import resolve
+from pdf_stream import PAGE_EXCLUDED_KEYS, _child_refs, _is_skipped
+from PyPDF2.generic import IndirectObject
+from ranges import PageSelection
+
+# Size estimates for cutting a PDF into chunks of at most N bytes without
+# writing trial files. An object's size is the gap between its offset and the
+# next one in the xref. Objects packed in an object stream get an equal share
+# of that stream when the output packs them again (optimize); otherwise they
+# are written out plainly, so their size is their uncompressed length inside
+# the stream. A chunk costs the objects its pages reach, counting objects
+# shared between its pages (fonts, images) once. The writer compresses and
+# deduplicates, so real outputs come out at or below the estimate.
+
+# Header, catalog, page tree and trailer of each output
+CHUNK_OVERHEAD = 1024
+
+# Per object: xref entry and "n 0 obj ... endobj" framing
+OBJECT_OVERHEAD = 40
+
+SIZE_UNITS = {"kb": 1024, "mb": 1024 * 1024, "gb": 1024 * 1024 * 1024}
+
+
+def parse_size(text):
+    # "10 MB", "500kb", "2.5 MB" -> bytes, or None if it isn't a size
+    text = text.strip().lower()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            try:
+                size = float(text[: -len(unit)])
+            except ValueError:
+                return None
+            return int(size * factor) if size > 0 else None
+    return None
+
+
+def object_sizes(reader, optimize=True, guard=None):
+    stream = reader.stream
+    stream.seek(0, os.SEEK_END)
+    file_size = stream.tell()
+
+    offsets = sorted(
+        (offset, idnum)
+        for entries in reader.xref.values()
+        for idnum, offset in entries.items()
+        if offset
+    )
+    sizes = {}
+    for (offset, idnum), (next_offset, _) in zip(
+        offsets, offsets[1:] + [(file_size, None)]
+    ):
+        sizes[idnum] = next_offset - offset
+
+    if not optimize:
+        sizes.update(_unpacked_sizes(reader, guard))
+        return sizes
+    packed = Counter(stream_number for stream_number, _ in reader.xref_objStm.values())
+    for idnum, (stream_number, _) in reader.xref_objStm.items():
+        sizes[idnum] = sizes.get(stream_number, 0) // packed[stream_number]
+    return sizes
+
+
+def _unpacked_sizes(reader, guard=None):
+    # Uncompressed length of every object in the reader's object streams,
+    # from the offsets in each stream's header
+    sizes = {}
+    for stream_number in {number for number, _ in reader.xref_objStm.values()}:
+        stream = resolve(IndirectObject(stream_number, 0, reader), guard)
+        data = stream.get_data()
+        first = int(stream["/First"])
+        header = data[:first].split()
+        numbers = [int(number) for number in header[0::2]]
+        offsets = [int(offset) for offset in header[1::2]]
+        for number, offset, end in zip(
+            numbers, offsets, offsets[1:] + [len(data) - first]
+        ):
+            sizes[number] = end - offset
+        if guard is not None:
+            # Release the stream before decoding the next one
+            guard.after_page()
+    return sizes
+
+
+class PageSizer:
+    def __init__(self, reader, optimize=True, guard=None):
+        self.reader = reader
+        # Optional memory.MemoryGuard consulted before each object is loaded
+        self.guard = guard
+        self.sizes = object_sizes(reader, optimize, guard)
+        self.children = {}  # idnum -> (idnum, reference) per child
+
+    def _children(self, ref):
+        if ref.idnum not in self.children:
+            obj = resolve(ref, self.guard)
+            skipped = obj is None or _is_skipped(obj)
+            refs = [] if skipped else _child_refs(obj)
+            self.children[ref.idnum] = [(child.idnum, child) for child in refs]
+        return self.children[ref.idnum]
+
+    def page_objects(self, index):
+        # Numbers of the objects a page reaches, the page included
+        page = self.reader.pages[index]
+        reached = {page.indirect_reference.idnum}
+        pending = _child_refs(page, PAGE_EXCLUDED_KEYS)
+        while pending:
+            ref = pending.pop()
+            if ref.idnum in reached:
+                continue
+            reached.add(ref.idnum)
+            pending.extend(
+                child for idnum, child in self._children(ref) if idnum not in reached
+            )
+        return reached
+
+    def cost(self, objects):
+        return sum(self.sizes.get(idnum, 0) + OBJECT_OVERHEAD for idnum in objects)
+
+    def after_page(self):
+        # With a guard, memory tracks one page: the children found so far
+        # are dropped along with the parsed objects
+        if self.guard is not None:
+            self.children.clear()
+            self.guard.after_page()
+
+
+def chunk_label(start, stop):
+    # Page numbers as in the output file name: "7" or "7-12"
+    return str(start + 1) if stop == start + 1 else f"{start + 1}-{stop}"
+
+
+def size_chunks(reader, max_bytes, guard=None, optimize=True):
+    # Consecutive pages grouped so each chunk's estimate stays within
+    # max_bytes, as (label, pages) per chunk. A page that exceeds the limit
+    # on its own gets a chunk to itself.
+    sizer = PageSizer(reader, optimize, guard)
+    chunks = []
+    start, reached, estimate = 0, set(), CHUNK_OVERHEAD
+
+    for index in range(len(reader.pages)):
+        objects = sizer.page_objects(index)
+        added = sizer.cost(objects - reached)
+        if index > start and estimate + added > max_bytes:
+            chunks.append((start, index))
+            start, reached, estimate = index, set(), CHUNK_OVERHEAD
+            added = sizer.cost(objects)
+        reached |= objects
+        estimate += added
+        sizer.after_page()
+    if len(reader.pages) > start:
+        chunks.append((start, len(reader.pages)))
+
+    return [
+        (chunk_label(start, stop), PageSelection([range(start, stop)]))
+        for start, stop in chunks
+    ]
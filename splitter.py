@@ -0,0 +1,434 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import metrics
+from batch import batch_extract, default_workers
+from core import (
+    JobError,
+    expand_inputs,
+    read_input_list,
+    extract_pages,
+    split_pages,
+    merge_pdfs,
+    append_pdfs,
+    extract_slides,
+    merge_presentations,
+)
+from ranges import range_label
+from sinks import STDOUT
+
+# Command-line entry point. Keep this module free of PyQt6 imports so it
+# starts quickly and runs on machines without a display.
+
+EXIT_OK = 0
+EXIT_JOB_ERROR = 1
+EXIT_FAILED = 3
+
+
+def default_output(input_file, suffix, extension):
+    dir_path = os.path.dirname(input_file)
+    base_name = os.path.splitext(os.path.basename(input_file))[0]
+    return os.path.join(dir_path, f"{base_name}_{suffix}{extension}")
+
+
+def large_file_options(args):
+    memory_limit = args.memory_limit and args.memory_limit * 1024 * 1024
+    return {"large_file": args.large_file, "memory_limit": memory_limit}
+
+
+def image_options(args):
+    return {"image_dpi": args.image_dpi, "image_quality": args.image_quality}
+
+
+def run_extract(args):
+    # Same naming as the window's extract form
+    output = args.output or default_output(
+        args.input,
+        "pages_" + range_label(args.pages),
+        ".pdf",
+    )
+    return extract_pages(
+        args.input,
+        output,
+        args.pages,
+        optimize=args.optimize,
+        **large_file_options(args),
+        **image_options(args),
+    )
+
+
+def run_split(args):
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    return split_pages(
+        args.input,
+        args.output_dir,
+        args.pages,
+        args.workers or default_workers(),
+        optimize=args.optimize,
+        **large_file_options(args),
+        **image_options(args),
+    )
+
+
+def run_merge(args):
+    input_files = expand_inputs(args.inputs)
+    if args.list:
+        input_files.extend(read_input_list(args.list))
+    if not input_files:
+        raise JobError("No input files given.")
+
+    output = args.output or default_output(input_files[0], "merged", ".pdf")
+    return merge_pdfs(
+        input_files,
+        output,
+        optimize=args.optimize,
+        **large_file_options(args),
+        **image_options(args),
+    )
+
+
+def run_append(args):
+    input_files = expand_inputs(args.inputs)
+    if args.list:
+        input_files.extend(read_input_list(args.list))
+    if not input_files:
+        raise JobError("No input files given.")
+
+    return append_pdfs(
+        args.target,
+        input_files,
+        optimize=args.optimize,
+        **large_file_options(args),
+        **image_options(args),
+    )
+
+
+def run_slides(args):
+    output = args.output or default_output(
+        args.input, "slides_" + range_label(args.slides).replace("-", "_"), ".pptx"
+    )
+    return extract_slides(args.input, output, args.slides)
+
+
+def run_merge_slides(args):
+    input_files = expand_inputs(args.inputs, "*.pptx")
+    if args.list:
+        input_files.extend(read_input_list(args.list))
+    if not input_files:
+        raise JobError("No input files given.")
+
+    output = args.output or default_output(input_files[0], "merged", ".pptx")
+    return merge_presentations(input_files, output)
+
+
+def run_batch(args):
+    input_files = expand_inputs(args.inputs)
+    if args.list:
+        input_files.extend(read_input_list(args.list))
+    if not input_files:
+        raise JobError("No input files given.")
+
+    return batch_extract(input_files, args.pages, args.output_dir, args.workers)
+
+
+def run_watch(args):
+    from watch import load_rules, watch_folders
+
+    def print_result(result):
+        # One JSON line per processed file while the watch runs
+        print(json.dumps(result), flush=True)
+
+    rules = load_rules(args.rules)
+    return watch_folders(rules, args.workers, args.poll, print_result)
+
+
+def run_inspect(args):
+    from inspection import inspect_paths
+
+    return inspect_paths(args.inputs, args.workers, args.index, args.use_index)
+
+
+def run_serve(args):
+    from server import serve
+
+    def print_ready(status):
+        # One JSON line once the server is listening
+        print(json.dumps(status), flush=True)
+
+    return serve(args.host, args.port, args.workers, args.queue_size, print_ready)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="splitter",
+        description="Split and merge PDF files and extract slides from PPTX files.",
+    )
+    parser.add_argument(
+        "--log",
+        metavar="PATH",
+        default=metrics.LOG_DESTINATION,
+        help='append a JSON log record per job to PATH ("-" for stderr)',
+    )
+    parser.add_argument(
+        "--profile",
+        choices=metrics.PROFILE_MODES,
+        default=metrics.PROFILE_MODE,
+        help="profile the job with cProfile (cpu) or tracemalloc (memory)",
+    )
+    parser.add_argument(
+        "--profile-output",
+        metavar="PATH",
+        help="where to write the profile (default: splitter-COMMAND-TIME.prof "
+        "or .tracemalloc in the current directory)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    extract = subparsers.add_parser("extract", help="extract pages from a PDF")
+    extract.add_argument("input", help="input PDF file")
+    extract.add_argument(
+        "-p", "--pages", required=True, help='page range, e.g. "1,2" or "1-3,5-7"'
+    )
+    extract.add_argument(
+        "-o", "--output", help='output PDF file ("-" for standard output)'
+    )
+    extract.set_defaults(func=run_extract)
+
+    split = subparsers.add_parser(
+        "split", help="write several PDFs from one input in a single pass"
+    )
+    split.add_argument("input", help="input PDF file")
+    split.add_argument(
+        "-p",
+        "--pages",
+        required=True,
+        help='one range per output, e.g. "1-10;11-20", or chunks: "every 50 '
+        'pages", "every page" or "every 10 MB"',
+    )
+    split.add_argument(
+        "-d",
+        "--output-dir",
+        help="folder for the output files (default: next to input)",
+    )
+    split.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="outputs written in parallel (default: number of available cores)",
+    )
+    split.set_defaults(func=run_split)
+
+    merge = subparsers.add_parser("merge", help="merge PDF files in order")
+    merge.add_argument(
+        "inputs", nargs="*", help="input PDF files or glob patterns, in order"
+    )
+    merge.add_argument(
+        "-l", "--list", help="file listing input PDFs in order, one per line"
+    )
+    merge.add_argument(
+        "-o", "--output", help='output PDF file ("-" for standard output)'
+    )
+    merge.set_defaults(func=run_merge)
+
+    append = subparsers.add_parser(
+        "append",
+        help="append pages to a PDF in place, writing only the new pages "
+        "(incremental update)",
+    )
+    append.add_argument("target", help="PDF file to append to")
+    append.add_argument(
+        "inputs", nargs="*", help="PDF files or glob patterns to append, in order"
+    )
+    append.add_argument(
+        "-l", "--list", help="file listing PDFs to append in order, one per line"
+    )
+    append.set_defaults(func=run_append)
+
+    slides = subparsers.add_parser("slides", help="extract slides from a PPTX")
+    slides.add_argument("input", help="input PPTX file")
+    slides.add_argument(
+        "-s", "--slides", required=True, help='slide range, e.g. "1,2" or "1-3,5-7"'
+    )
+    slides.add_argument(
+        "-o", "--output", help='output PPTX file ("-" for standard output)'
+    )
+    slides.set_defaults(func=run_slides)
+
+    merge_slides = subparsers.add_parser(
+        "merge-slides", help="merge PPTX files in order"
+    )
+    merge_slides.add_argument(
+        "inputs", nargs="*", help="input PPTX files or glob patterns, in order"
+    )
+    merge_slides.add_argument(
+        "-l", "--list", help="file listing input PPTX files in order, one per line"
+    )
+    merge_slides.add_argument(
+        "-o", "--output", help='output PPTX file ("-" for standard output)'
+    )
+    merge_slides.set_defaults(func=run_merge_slides)
+
+    batch = subparsers.add_parser(
+        "batch", help="extract the same pages from many PDFs in parallel"
+    )
+    batch.add_argument(
+        "inputs", nargs="*", help="input PDF files, folders or glob patterns"
+    )
+    batch.add_argument("-l", "--list", help="file listing input PDFs, one per line")
+    batch.add_argument(
+        "-p", "--pages", required=True, help='page range, e.g. "1-2" for cover pages'
+    )
+    batch.add_argument(
+        "-d",
+        "--output-dir",
+        help="folder for the output files (default: next to each input)",
+    )
+    batch.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="worker processes (default: number of available cores)",
+    )
+    batch.set_defaults(func=run_batch)
+
+    inspect = subparsers.add_parser(
+        "inspect", help="list page counts, encryption and sizes of PDF and PPTX files"
+    )
+    inspect.add_argument(
+        "inputs", nargs="+", help="files or folders (searched recursively)"
+    )
+    inspect.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="worker processes (default: number of available cores)",
+    )
+    inspect.add_argument(
+        "--index",
+        metavar="PATH",
+        help="SQLite index of earlier results (default: in the app data folder)",
+    )
+    inspect.add_argument(
+        "--no-index",
+        dest="use_index",
+        action="store_false",
+        help="inspect every file and don't update the index",
+    )
+    inspect.set_defaults(func=run_inspect)
+
+    serve = subparsers.add_parser(
+        "serve", help="serve extract, merge and slides over HTTP until stopped"
+    )
+    serve.add_argument(
+        "--host", default="127.0.0.1", help="address to listen on (default: 127.0.0.1)"
+    )
+    serve.add_argument(
+        "-p", "--port", type=int, default=8080, help="port (default: 8080, 0 for any)"
+    )
+    serve.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="worker processes (default: number of available cores)",
+    )
+    serve.add_argument(
+        "-q",
+        "--queue-size",
+        type=int,
+        default=16,
+        help="requests waiting for a worker before others are refused with 503 "
+        "(default: 16)",
+    )
+    serve.set_defaults(func=run_serve)
+
+    watch = subparsers.add_parser(
+        "watch", help="process files dropped into hot folders until stopped"
+    )
+    watch.add_argument("rules", help="JSON file listing the folders and their rules")
+    watch.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="worker processes (default: number of available cores)",
+    )
+    watch.add_argument(
+        "--poll",
+        action="store_true",
+        help="scan the folders periodically instead of using inotify "
+        "(needed for network shares)",
+    )
+    watch.set_defaults(func=run_watch)
+
+    for pdf_parser in (extract, split, merge, append):
+        pdf_parser.add_argument(
+            "--no-optimize",
+            dest="optimize",
+            action="store_false",
+            help="skip object deduplication and object streams",
+        )
+        pdf_parser.add_argument(
+            "--large-file",
+            action="store_true",
+            help="memory-map the input and release parsed objects after each page",
+        )
+        pdf_parser.add_argument(
+            "--memory-limit",
+            type=int,
+            metavar="MB",
+            help="stop if resident memory would exceed MB (implies --large-file)",
+        )
+        pdf_parser.add_argument(
+            "--image-dpi",
+            type=int,
+            metavar="DPI",
+            help="downsample images above DPI and store them as JPEG",
+        )
+        pdf_parser.add_argument(
+            "--image-quality",
+            type=int,
+            metavar="Q",
+            help="JPEG quality for downsampled images, 1-95 (default: 75)",
+        )
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    metrics.configure_logging(args.log)
+    profile_output = args.profile and (
+        args.profile_output or metrics.default_profile_path(args.command, args.profile)
+    )
+
+    try:
+        with metrics.profiled(args.profile, profile_output):
+            result = args.func(args)
+    except JobError as e:
+        result, exit_code = {"ok": False, "error": str(e)}, EXIT_JOB_ERROR
+        metrics.log_failure(args.command, result["error"])
+    except Exception as e:
+        result, exit_code = {
+            "ok": False,
+            "error": f"An error occurred: {str(e)}",
+        }, EXIT_FAILED
+        metrics.log_failure(args.command, result["error"])
+    else:
+        # Batch results are "ok" only when every file succeeded
+        exit_code = EXIT_OK if result["ok"] else EXIT_JOB_ERROR
+
+    # One JSON document per invocation on stdout, for shell pipelines; on
+    # stderr when the document itself goes to stdout
+    result["command"] = args.command
+    if profile_output:
+        result["profile"] = os.path.abspath(profile_output)
+    to_stdout = getattr(args, "output", None) == STDOUT
+    print(json.dumps(result), file=sys.stderr if to_stdout else sys.stdout)
+    return exit_code
+
+
+if __name__ == "__main__":
+    # Needed for process pools in frozen (PyInstaller) builds on Windows
+    multiprocessing.freeze_support()
+    sys.exit(main())
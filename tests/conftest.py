@@ -0,0 +1,13 @@
+import os
+import sys
+import pytest
+from release_server import ReleaseServer
+
+# The modules live at the top of the repository, next to this folder
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def release_server():
+    with ReleaseServer() as server:
+        yield server
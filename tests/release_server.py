@@ -0,0 +1,93 @@
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# A local stand-in for the release host: serves fixed files over HTTP/1.1
+# with Range and ETag support, and can misbehave on request (drop the
+# connection part-way, ignore Range) so the updater's recovery paths can be
+# tested without the network. Every request is recorded.
+
+
+class ReleaseServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), ReleaseHandler)
+        # Path -> bytes
+        self.files = {}
+        # Path -> ETag
+        self.etags = {}
+        # (path, headers) of every request, in order
+        self.requests = []
+        # Bytes sent before the connection is dropped, for the next request
+        # of a file only
+        self.drop_after = {}
+        # Answer Range requests with the whole file and 200
+        self.ignore_range = False
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+        self.server_close()
+
+
+class ReleaseHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, dict(self.headers)))
+        data = server.files.get(self.path)
+        if data is None:
+            self.send_error(404)
+            return
+
+        etag = server.etags.get(self.path)
+        if etag is not None and self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        status, start, end = 200, 0, len(data) - 1
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match and not server.ignore_range:
+            start = int(match.group(1))
+            if match.group(2):
+                end = min(end, int(match.group(2)))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+
+        body = data[start : end + 1]
+        self.send_response(status)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+
+        drop_after = server.drop_after.pop(self.path, None)
+        if drop_after is not None:
+            # The full length was announced; the client sees a cut-off body
+            self.wfile.write(body[:drop_after])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
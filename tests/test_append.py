@@ -0,0 +1,34 @@
+import re
+import pytest
+from PyPDF2 import PdfReader
+from benchmarks.generate import make_pdf
+from core import append_pdfs, extract_pages
+
+
+@pytest.mark.parametrize("xref_stream", [False, True])
+def test_update_section_leaves_object_0_alone(tmp_path, xref_stream):
+    target = tmp_path / "archive.pdf"
+    make_pdf(target, 3)
+    if xref_stream:
+        # Optimized output has an xref stream
+        packed = tmp_path / "packed.pdf"
+        extract_pages(str(target), str(packed), "1-")
+        target = packed
+    original = target.read_bytes()
+    make_pdf(tmp_path / "extra.pdf", 2, seed=1)
+
+    result = append_pdfs(str(target), [str(tmp_path / "extra.pdf")])
+
+    assert result["ok"]
+    update = target.read_bytes()[len(original) :]
+    if xref_stream:
+        [index] = re.findall(rb"/Index \[([\d ]+)\]", update)
+        firsts = [int(number) for number in index.split()[0::2]]
+    else:
+        section = update[update.rindex(b"\nxref\n") :]
+        firsts = [
+            int(first)
+            for first in re.findall(rb"\n(\d+) \d+\n", section.split(b"trailer")[0])
+        ]
+    assert firsts and 0 not in firsts
+    assert len(PdfReader(target).pages) == 5
@@ -0,0 +1,45 @@
+import os
+import batch
+from benchmarks.generate import make_pdf
+
+
+def test_inputs_with_the_same_output_name_fail(tmp_path):
+    for folder in ("a", "b", "c"):
+        os.makedirs(tmp_path / folder)
+    make_pdf(tmp_path / "a" / "scan.pdf", 2)
+    make_pdf(tmp_path / "b" / "scan.pdf", 2)
+    make_pdf(tmp_path / "c" / "other.pdf", 2)
+    inputs = [
+        str(tmp_path / "a" / "scan.pdf"),
+        str(tmp_path / "b" / "scan.pdf"),
+        str(tmp_path / "c" / "other.pdf"),
+    ]
+
+    result = batch.batch_extract(inputs, "1", str(tmp_path / "out"), workers=2)
+
+    assert not result["ok"]
+    assert (result["succeeded"], result["failed"]) == (1, 2)
+    first, second, other = result["results"]
+    assert not first["ok"] and not second["ok"]
+    assert "scan_pages_1.pdf" in first["error"]
+    assert other["ok"]
+    assert os.listdir(tmp_path / "out") == ["other_pages_1.pdf"]
+
+
+def _crash(input_file, page_range, output_dir):
+    os._exit(1)
+
+
+def test_crashed_worker_is_recorded_per_file(tmp_path, monkeypatch):
+    make_pdf(tmp_path / "one.pdf", 2)
+    make_pdf(tmp_path / "two.pdf", 2)
+    inputs = [str(tmp_path / "one.pdf"), str(tmp_path / "two.pdf")]
+    monkeypatch.setattr(batch, "_extract_one", _crash)
+
+    result = batch.batch_extract(inputs, "1", workers=2)
+
+    assert result["failed"] == 2
+    assert [entry["inputs"] for entry in result["results"]] == [
+        [os.path.abspath(path)] for path in inputs
+    ]
+    assert all(entry["error"] for entry in result["results"])
@@ -0,0 +1,157 @@
+import hashlib
+import io
+import json
+import os
+import random
+import zipfile
+import pytest
+import updater
+from updater import UpdateError, install_update, prepare_delta_update
+
+# Delta updates against a local release server: only changed files are
+# fetched from the zip, the manifest must match its published SHA-256, and
+# files dropped from the release are removed.
+
+rng = random.Random(0)
+OLD_FILES = {
+    "Splitter.exe": rng.randbytes(400_000),
+    "lib/core.dll": rng.randbytes(300_000),
+    "lib/retired.dll": rng.randbytes(1000),
+}
+NEW_FILES = dict(OLD_FILES, **{"lib/core.dll": rng.randbytes(20_000)})
+del NEW_FILES["lib/retired.dll"]
+
+
+def manifest(files):
+    entries = {
+        path: {"sha256": hashlib.sha256(data).hexdigest(), "size": len(data)}
+        for path, data in files.items()
+    }
+    return json.dumps({"files": entries}).encode()
+
+
+def release_zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zip_file:
+        for path, data in files.items():
+            zip_file.writestr("Splitter/" + path, data)
+        zip_file.writestr("Splitter/manifest.json", manifest(files))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def install_dir(tmp_path):
+    # The previous release, installed with its manifest
+    folder = tmp_path / "install"
+    for path, data in OLD_FILES.items():
+        (folder / path).parent.mkdir(parents=True, exist_ok=True)
+        (folder / path).write_bytes(data)
+    (folder / "manifest.json").write_bytes(manifest(OLD_FILES))
+    return str(folder)
+
+
+@pytest.fixture
+def release(release_server):
+    data = release_zip(NEW_FILES)
+    release_server.files["/Splitter.zip"] = data
+    release_server.files["/manifest.json"] = manifest(NEW_FILES)
+    return {
+        "url": release_server.url("/Splitter.zip"),
+        "sha256": hashlib.sha256(data).hexdigest(),
+        "manifest_url": release_server.url("/manifest.json"),
+        "manifest_sha256": hashlib.sha256(manifest(NEW_FILES)).hexdigest(),
+    }
+
+
+def test_delta_stages_changed_files_and_removes_dropped_ones(
+    release, install_dir, tmp_path
+):
+    updates_dir = str(tmp_path / "updates")
+    os.makedirs(updates_dir)
+
+    result = prepare_delta_update(
+        release["url"],
+        release["manifest_url"],
+        release["manifest_sha256"],
+        install_dir,
+        updates_dir,
+    )
+
+    assert result["delta"] and result["files"] == 1 and result["files_removed"] == 1
+    assert result["bytes_downloaded"] < len(release_zip(NEW_FILES)) * 0.6
+    staged = os.path.join(updates_dir, "staged")
+    with open(os.path.join(staged, "lib", "core.dll"), "rb") as f:
+        assert f.read() == NEW_FILES["lib/core.dll"]
+    with open(os.path.join(staged, "manifest.json"), "rb") as f:
+        assert f.read() == manifest(NEW_FILES)
+    assert not os.path.exists(os.path.join(staged, "Splitter.exe"))
+    with open(result["script"]) as f:
+        script = f.read()
+    assert os.path.join(install_dir, "lib", "retired.dll") in script
+    assert os.path.join(install_dir, "Splitter.exe") not in script
+
+
+def test_files_not_installed_by_a_release_are_kept(release, install_dir, tmp_path):
+    os.remove(os.path.join(install_dir, "manifest.json"))
+    updates_dir = str(tmp_path / "updates")
+    os.makedirs(updates_dir)
+
+    result = prepare_delta_update(
+        release["url"],
+        release["manifest_url"],
+        release["manifest_sha256"],
+        install_dir,
+        updates_dir,
+    )
+
+    assert result["files_removed"] == 0
+    with open(result["script"]) as f:
+        assert "del /f" not in f.read()
+
+
+def test_tampered_manifest_is_rejected(release_server, release, install_dir, tmp_path):
+    # Claims the installed core.dll is current, so it would never be updated
+    release_server.files["/manifest.json"] = manifest(OLD_FILES)
+
+    with pytest.raises(UpdateError, match="manifest"):
+        prepare_delta_update(
+            release["url"],
+            release["manifest_url"],
+            release["manifest_sha256"],
+            install_dir,
+            str(tmp_path / "updates"),
+        )
+
+
+def test_rejected_manifest_falls_back_to_full_zip(
+    release_server, release, install_dir, tmp_path
+):
+    release_server.files["/manifest.json"] = manifest(OLD_FILES)
+
+    result = install_update(
+        release["url"],
+        release["sha256"],
+        release["manifest_url"],
+        release["manifest_sha256"],
+        install_dir,
+        str(tmp_path / "updates"),
+    )
+
+    assert "delta" not in result
+    paths = [path for path, _ in release_server.requests]
+    assert paths.count("/Splitter.zip") == 1
+
+
+def test_manifest_without_checksum_is_not_used():
+    release_info = {
+        "assets": [
+            {"name": "Splitter.zip", "browser_download_url": "z", "digest": "sha256:0"},
+            {"name": "manifest.json", "browser_download_url": "m"},
+        ]
+    }
+    assert updater.release_manifest(release_info) is None
+    release_info["assets"].append(
+        {"name": "manifest.json.sha256", "browser_download_url": "m.sha256"}
+    )
+    release_info["assets"][1]["digest"] = "sha256:ABC"
+    assert updater.release_manifest(release_info) == ("m", "abc")
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from PyPDF2 import PdfReader
+from benchmarks.generate import make_pdf
+
+# Extracting a few pages from a multi-gigabyte PDF in large-file mode must
+# stay under the memory limit. The job runs in its own process so peak_rss
+# only covers the extract. SPLITTER_LARGE_TEST_MB sets the input size (2 GB
+# by default; lower it for a quick run).
+
+SPLITTER = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "splitter.py"
+)
+
+INPUT_MB = int(os.environ.get("SPLITTER_LARGE_TEST_MB", 2048))
+IMAGE_KB = 1024
+PAGES = max(20, INPUT_MB * 1024 // IMAGE_KB)
+MEMORY_LIMIT_MB = 256
+
+
+@pytest.fixture(scope="module")
+def large_pdf(tmp_path_factory):
+    path = tmp_path_factory.mktemp("large") / "large.pdf"
+    make_pdf(path, PAGES, image_kb=IMAGE_KB)
+    yield path
+    os.remove(path)
+
+
+def test_extract_stays_under_memory_limit(large_pdf, tmp_path):
+    output = tmp_path / "out.pdf"
+    middle = PAGES // 2
+    completed = subprocess.run(
+        [
+            sys.executable,
+            SPLITTER,
+            "extract",
+            str(large_pdf),
+            "-p",
+            f"{middle}-{middle + 9}",
+            "-o",
+            str(output),
+            "--memory-limit",
+            str(MEMORY_LIMIT_MB),
+        ],
+        capture_output=True,
+        text=True,
+    )
+    result = json.loads(completed.stdout)
+
+    assert completed.returncode == 0, result
+    assert result["pages"] == 10, result
+    assert result["peak_rss"] < MEMORY_LIMIT_MB * 1024 * 1024, result
+    assert len(PdfReader(output).pages) == 10
@@ -0,0 +1,70 @@
+import pytest
+from benchmarks.generate import make_pdf
+from core import JobError
+from memory import MemoryGuard, open_mapped_pdf
+from recompress import _page_images
+from sizing import PageSizer, size_chunks
+
+# Size and image scans of mapped inputs load objects through the memory guard
+# like the page copy does, so they are held to the same limit.
+
+
+class CountingGuard(MemoryGuard):
+    def __init__(self, reader, limit=None):
+        super().__init__(reader, limit)
+        self.resolved = set()
+        self.pages = 0
+
+    def before_resolve(self, ref):
+        self.resolved.add(ref.idnum)
+        super().before_resolve(ref)
+
+    def after_page(self):
+        self.pages += 1
+        super().after_page()
+
+
+@pytest.fixture
+def image_pdf(tmp_path):
+    path = tmp_path / "images.pdf"
+    make_pdf(path, 5, image_kb=8)
+    return path
+
+
+def test_size_chunks_resolve_through_the_guard(image_pdf):
+    with open_mapped_pdf(image_pdf) as reader:
+        guard = CountingGuard(reader)
+        chunks = size_chunks(reader, 20 * 1024, guard)
+
+        images = {
+            reader.pages[index]["/Resources"]["/XObject"].raw_get("/Im1").idnum
+            for index in range(5)
+        }
+        assert images <= guard.resolved
+        assert guard.pages == 5
+        assert len(chunks) > 1
+
+
+def test_page_sizer_drops_its_cache_after_each_page(image_pdf):
+    with open_mapped_pdf(image_pdf) as reader:
+        sizer = PageSizer(reader, guard=CountingGuard(reader))
+        sizer.page_objects(0)
+        assert sizer.children
+        sizer.after_page()
+        assert not sizer.children
+        assert not reader.resolved_objects
+
+
+def test_image_scan_resolves_through_the_guard(image_pdf):
+    with open_mapped_pdf(image_pdf) as reader:
+        guard = CountingGuard(reader)
+        [(ref, image)] = _page_images(reader.pages[0], guard)
+        assert ref.idnum in guard.resolved
+        assert image["/Subtype"] == "/Image"
+
+
+def test_image_scan_stops_at_the_memory_limit(image_pdf):
+    with open_mapped_pdf(image_pdf) as reader:
+        page = reader.pages[0]
+        with pytest.raises(JobError, match="memory limit"):
+            _page_images(page, MemoryGuard(reader, limit=1))
@@ -0,0 +1,10 @@
+import pytest
+from benchmarks.generate import make_pptx
+from core import JobError, merge_presentations
+
+
+def test_merging_a_single_deck_is_rejected(tmp_path):
+    make_pptx(tmp_path / "deck.pptx", 2)
+    with pytest.raises(JobError, match="at least two"):
+        merge_presentations([str(tmp_path / "deck.pptx")], str(tmp_path / "out.pptx"))
+    assert not (tmp_path / "out.pptx").exists()
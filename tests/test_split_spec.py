@@ -0,0 +1,14 @@
+import pytest
+from core import JobError, parse_split_spec
+
+
+@pytest.mark.parametrize("spec", ["every 50", "every 50 pages", "every 50 page"])
+def test_every_n_pages(spec):
+    labels = [label for label, _ in parse_split_spec(spec, 120)]
+    assert labels == ["1-50", "51-100", "101-120"]
+
+
+@pytest.mark.parametrize("spec", ["every 50 foo", "every 50 pages please", "every"])
+def test_every_n_with_an_unknown_unit_is_rejected(spec):
+    with pytest.raises(JobError, match="Invalid split"):
+        parse_split_spec(spec, 120)
@@ -0,0 +1,33 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+
+# Time to first window, and the modules kept off the startup path (see
+# main.DEFERRED_MODULES). Runs `main.py --measure-startup` on Qt's offscreen
+# platform, so no display is needed.
+
+pytest.importorskip("PyQt6.QtWidgets")
+
+MAIN = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py"
+)
+
+
+def test_startup_within_budget_without_deferred_modules(tmp_path):
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    env["SPLITTER_DATA_DIR"] = str(tmp_path)
+    completed = subprocess.run(
+        [sys.executable, MAIN, "--measure-startup"],
+        capture_output=True,
+        text=True,
+        env=env,
+        cwd=tmp_path,
+        timeout=60,
+    )
+    report = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    assert report["deferred_modules_loaded"] == []
+    assert report["startup_ms"] <= report["budget_ms"], report
+    assert completed.returncode == 0, completed.stderr
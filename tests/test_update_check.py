@@ -0,0 +1,54 @@
+import json
+import pytest
+from updater import latest_release
+
+# The cached, conditional update check (see updater.latest_release) against
+# a local release server.
+
+RELEASE = {"tag_name": "v9.9.9", "assets": []}
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    monkeypatch.setenv("SPLITTER_DATA_DIR", str(tmp_path))
+
+
+@pytest.fixture
+def release_url(release_server):
+    release_server.files["/releases/latest"] = json.dumps(RELEASE).encode()
+    release_server.etags["/releases/latest"] = '"v1"'
+    return release_server.url("/releases/latest")
+
+
+def test_check_within_interval_uses_cache(release_server, release_url):
+    assert latest_release(release_url, interval=3600) == RELEASE
+    assert latest_release(release_url, interval=3600) == RELEASE
+    assert len(release_server.requests) == 1
+
+
+def test_unchanged_release_is_revalidated_with_etag(release_server, release_url):
+    assert latest_release(release_url, interval=0) == RELEASE
+    assert latest_release(release_url, interval=0) == RELEASE
+
+    first, second = (headers for _, headers in release_server.requests)
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == '"v1"'
+
+
+def test_changed_release_replaces_cached_one(release_server, release_url):
+    latest_release(release_url, interval=0)
+    newer = dict(RELEASE, tag_name="v10.0.0")
+    release_server.files["/releases/latest"] = json.dumps(newer).encode()
+    release_server.etags["/releases/latest"] = '"v2"'
+
+    assert latest_release(release_url, interval=0) == newer
+    assert latest_release(release_url, interval=0) == newer
+    assert release_server.requests[-1][1]["If-None-Match"] == '"v2"'
+
+
+def test_failed_check_is_not_retried_within_interval(release_server):
+    url = release_server.url("/missing")
+    with pytest.raises(Exception):
+        latest_release(url, interval=3600)
+    assert latest_release(url, interval=3600) is None
+    assert len(release_server.requests) == 1
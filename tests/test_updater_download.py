@@ -0,0 +1,121 @@
+import hashlib
+import os
+import pytest
+import updater
+from updater import UpdateError, download_file
+
+# Update downloads against a local release server (see release_server):
+# resuming after a dropped connection, rejecting a corrupt file, and servers
+# that ignore Range.
+
+DATA = bytes(range(256)) * 12288 + b"end"
+SHA256 = hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr(updater, "RETRY_DELAY", 0)
+
+
+@pytest.fixture
+def zip_url(release_server):
+    release_server.files["/Splitter.zip"] = DATA
+    return release_server.url("/Splitter.zip")
+
+
+def ranges(release_server):
+    return [headers.get("Range") for _, headers in release_server.requests]
+
+
+def test_resumes_after_dropped_connection(release_server, zip_url, tmp_path):
+    release_server.drop_after["/Splitter.zip"] = 2_500_000
+    path = str(tmp_path / "update.zip")
+
+    download_file(zip_url, path, SHA256)
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert not os.path.exists(path + ".part")
+    # The second request continues from what the first one saved: whole
+    # chunks received before the connection dropped
+    first, second = ranges(release_server)
+    assert first is None
+    resumed_at = int(second[len("bytes=") : -len("-")])
+    assert 0 < resumed_at <= 2_500_000
+
+
+def test_resumes_partial_file_from_earlier_run(release_server, zip_url, tmp_path):
+    path = str(tmp_path / "update.zip")
+    with open(path + ".part", "wb") as f:
+        f.write(DATA[:12345])
+
+    download_file(zip_url, path, SHA256)
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert ranges(release_server) == ["bytes=12345-"]
+
+
+def test_complete_partial_file_is_not_downloaded_again(
+    release_server, zip_url, tmp_path
+):
+    path = str(tmp_path / "update.zip")
+    with open(path + ".part", "wb") as f:
+        f.write(DATA)
+
+    download_file(zip_url, path, SHA256)
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert ranges(release_server) == [f"bytes={len(DATA)}-"]
+
+
+def test_checksum_mismatch_is_rejected(release_server, zip_url, tmp_path):
+    path = str(tmp_path / "update.zip")
+
+    with pytest.raises(UpdateError, match="SHA-256"):
+        download_file(zip_url, path, hashlib.sha256(b"other").hexdigest())
+
+    # Neither the file nor a partial file to resume from is left behind
+    assert not os.path.exists(path)
+    assert not os.path.exists(path + ".part")
+
+
+def test_corrupt_partial_file_is_rejected_then_replaced(
+    release_server, zip_url, tmp_path
+):
+    path = str(tmp_path / "update.zip")
+    with open(path + ".part", "wb") as f:
+        f.write(b"x" * 1000)
+
+    with pytest.raises(UpdateError):
+        download_file(zip_url, path, SHA256)
+    download_file(zip_url, path, SHA256)
+
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+
+
+def test_server_ignoring_range_restarts_download(release_server, zip_url, tmp_path):
+    release_server.ignore_range = True
+    path = str(tmp_path / "update.zip")
+    with open(path + ".part", "wb") as f:
+        f.write(b"x" * 1000)
+
+    download_file(zip_url, path, SHA256)
+
+    # The 200 reply holds the whole file, which replaces the partial one
+    with open(path, "rb") as f:
+        assert f.read() == DATA
+    assert ranges(release_server) == ["bytes=1000-"]
+
+
+def test_release_without_the_zip_is_rejected():
+    release_info = {
+        "assets": [
+            {"name": "manifest.json", "browser_download_url": "https://x/m"},
+            {"name": "manifest.json.sha256", "browser_download_url": "https://x/s"},
+        ]
+    }
+    with pytest.raises(UpdateError, match="Splitter.zip"):
+        updater.release_asset(release_info)
@@ -0,0 +1,70 @@
+import os
+from concurrent.futures.process import BrokenProcessPool
+import pytest
+from PyPDF2 import PdfReader
+from benchmarks.generate import make_pdf
+from watch import FAILED_DIR, PROCESSED_DIR, QUEUE_SIZE, HotFolders, WatchedFolder
+
+
+def test_archive_keeps_inputs_dropped_twice_under_one_name(tmp_path):
+    folder = WatchedFolder({"path": str(tmp_path), "action": "extract"})
+    path = tmp_path / "scan.pdf"
+
+    for content in (b"first", b"second", b"third"):
+        path.write_bytes(content)
+        folder.claim(str(path))
+        folder.archive([str(path)], True)
+
+    archive_dir = tmp_path / PROCESSED_DIR
+    assert not path.exists()
+    assert sorted(os.listdir(archive_dir)) == ["scan.pdf", "scan_2.pdf", "scan_3.pdf"]
+    assert (archive_dir / "scan.pdf").read_bytes() == b"first"
+    assert (archive_dir / "scan_3.pdf").read_bytes() == b"third"
+    assert not folder.claimed
+
+
+def test_submit_replaces_a_broken_pool(tmp_path):
+    make_pdf(tmp_path / "scan.pdf", 3)
+    rule = {"path": str(tmp_path), "action": "extract", "pages": "1"}
+    hot_folders = HotFolders([rule], workers=1)
+    folder = hot_folders.folders[rule["path"]]
+    hot_folders.executor = hot_folders._create_executor()
+    try:
+        # A worker that dies breaks the pool for every later submit
+        with pytest.raises(BrokenProcessPool):
+            hot_folders.executor.submit(os._exit, 1).result()
+
+        hot_folders.slots.acquire()
+        output_file = tmp_path / "out.pdf"
+        hot_folders._submit(folder, [str(tmp_path / "scan.pdf")], str(output_file))
+    finally:
+        hot_folders.executor.shutdown(wait=True)
+
+    assert hot_folders.succeeded == 1
+    assert len(PdfReader(output_file).pages) == 1
+    assert (tmp_path / PROCESSED_DIR / "scan.pdf").exists()
+    # The slot was given back: all of them can be taken again
+    for _ in range(QUEUE_SIZE):
+        assert hot_folders.slots.acquire(blocking=False)
+
+
+def test_failed_submit_gives_back_its_slot(tmp_path):
+    class ClosedPool:
+        def submit(self, *args):
+            raise RuntimeError("cannot schedule new futures after shutdown")
+
+    (tmp_path / "scan.pdf").write_bytes(b"%PDF-1.4")
+    rule = {"path": str(tmp_path), "action": "extract", "pages": "1"}
+    hot_folders = HotFolders([rule], workers=1)
+    hot_folders.executor = ClosedPool()
+    hot_folders.slots.acquire()
+    hot_folders._submit(
+        hot_folders.folders[rule["path"]],
+        [str(tmp_path / "scan.pdf")],
+        str(tmp_path / "out.pdf"),
+    )
+
+    assert hot_folders.failed == 1
+    assert (tmp_path / FAILED_DIR / "scan.pdf").exists()
+    for _ in range(QUEUE_SIZE):
+        assert hot_folders.slots.acquire(blocking=False)
@@ -0,0 +1,536 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+import zipfile
+import config
+import metrics
+from core import JobCancelled, JobError, _never_cancelled, _no_progress
+
+# Checking for, downloading and unpacking application updates, off the GUI
+# thread.
+#
+# The latest release is cached in the app data folder with its ETag. Within
+# UPDATE_CHECK_INTERVAL of the last check the network is not used at all;
+# after that the request is conditional (If-None-Match), and GitHub answers an
+# unchanged release with 304, which does not count against its rate limit.
+#
+# The zip is downloaded to "<name>.part" in large chunks; after a dropped
+# connection the download resumes from where it stopped with an HTTP Range
+# request, also across restarts of the app. Nothing is extracted until the
+# SHA-256 of the whole file matches the one published with the release.
+
+UPDATES_DIR = "updates"
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Seconds to connect, and to wait for the next bytes once connected
+DOWNLOAD_TIMEOUT = (10, 30)
+
+# Attempts after a dropped connection, each resuming the partial file
+DOWNLOAD_RETRIES = 5
+RETRY_DELAY = 2
+
+
+# Seconds between update checks (SPLITTER_UPDATE_INTERVAL_HOURS)
+UPDATE_CHECK_INTERVAL = (
+    float(os.environ.get("SPLITTER_UPDATE_INTERVAL_HOURS", "24")) * 3600
+)
+
+# Seconds to connect, and to read the answer, when checking for updates
+UPDATE_CHECK_TIMEOUT = (3, 5)
+
+UPDATE_CHECK_STATE = "update_check.json"
+
+
+class UpdateError(JobError):
+    pass
+
+
+def latest_release(url, interval=UPDATE_CHECK_INTERVAL, session=None):
+    # The latest release as returned by the GitHub API, from the cache when
+    # possible. Returns None if there is no answer yet (e.g. first check
+    # failed).
+    state = config.load_state(UPDATE_CHECK_STATE) or {}
+    if state.get("url") != url:
+        state = {"url": url}
+    now = time.time()
+    if now - state.get("checked_at", 0) < interval:
+        return state.get("release")
+
+    import requests
+
+    headers = {"Accept": "application/vnd.github+json"}
+    if state.get("etag") and state.get("release"):
+        headers["If-None-Match"] = state["etag"]
+
+    # A failed check also counts, so a rate-limited or offline machine does
+    # not retry on every launch
+    state["checked_at"] = now
+    try:
+        response = (session or requests).get(
+            url, headers=headers, timeout=UPDATE_CHECK_TIMEOUT
+        )
+        if response.status_code != 304:
+            response.raise_for_status()
+            state["release"] = response.json()
+            state["etag"] = response.headers.get("ETag")
+    finally:
+        config.save_state(UPDATE_CHECK_STATE, state)
+    return state.get("release")
+
+
+def release_asset(release_info, name="Splitter.zip"):
+    # The update zip and its published SHA-256: GitHub's asset digest
+    # ("sha256:..."), or else a "<name>.sha256" asset next to it
+    assets = {asset["name"]: asset for asset in release_info.get("assets", [])}
+    asset = assets.get(name)
+    if asset is None:
+        raise UpdateError(f"The release does not include {name}.")
+
+    digest = asset.get("digest") or ""
+    checksum = assets.get(asset["name"] + ".sha256")
+    if digest.startswith("sha256:"):
+        sha256 = digest[len("sha256:") :]
+    elif checksum is not None:
+        sha256 = fetch_sha256(checksum["browser_download_url"])
+    else:
+        raise UpdateError("The release does not publish a SHA-256 checksum.")
+    return asset["browser_download_url"], sha256.lower()
+
+
+def fetch_sha256(url):
+    # "<hex digest>  <file name>", as written by sha256sum
+    import requests
+
+    response = requests.get(url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    fields = response.text.split()
+    if not fields or len(fields[0]) != 64:
+        raise UpdateError(f"Invalid checksum file: {url}")
+    return fields[0]
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(DOWNLOAD_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _download_part(session, url, part_path, progress, is_cancelled):
+    # One attempt: continue the partial file if there is one
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(
+        url, headers=headers, stream=True, timeout=DOWNLOAD_TIMEOUT
+    ) as response:
+        if response.status_code == 416:
+            # Nothing left to send; the partial file is complete
+            return
+        response.raise_for_status()
+
+        if offset and response.status_code == 206:
+            total = offset + int(response.headers.get("Content-Length", 0))
+            mode = "ab"
+        else:
+            # No range support (or a fresh start): start over
+            offset = 0
+            total = int(response.headers.get("Content-Length", 0))
+            mode = "wb"
+
+        done = offset
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if is_cancelled():
+                    raise JobCancelled()
+                f.write(chunk)
+                done += len(chunk)
+                progress(done, max(total, done))
+
+
+def download_file(
+    url,
+    path,
+    sha256,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    session=None,
+):
+    import requests
+
+    session = session or requests.Session()
+    part_path = path + ".part"
+    # A connection dropped in the middle of the body surfaces as a
+    # ChunkedEncodingError rather than a ConnectionError
+    dropped = (
+        requests.ConnectionError,
+        requests.Timeout,
+        requests.exceptions.ChunkedEncodingError,
+    )
+
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        try:
+            _download_part(session, url, part_path, progress, is_cancelled)
+            break
+        except dropped as e:
+            if attempt == DOWNLOAD_RETRIES:
+                raise UpdateError(f"Download failed: {e}")
+            time.sleep(RETRY_DELAY)
+
+    if file_sha256(part_path) != sha256:
+        # A corrupt partial file would fail every resume; start clean
+        os.remove(part_path)
+        raise UpdateError(
+            "The downloaded update is corrupt (SHA-256 mismatch). Please try again."
+        )
+    os.replace(part_path, path)
+    return path
+
+
+def extract_update(zip_path, updates_dir):
+    # Returns the Splitter folder inside the extracted update
+    extract_dir = os.path.join(updates_dir, "temp")
+    if os.path.exists(extract_dir):
+        shutil.rmtree(extract_dir)
+
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        zip_ref.extractall(extract_dir)
+
+    splitter_folder = os.path.join(extract_dir, "Splitter")
+    if not os.path.isdir(splitter_folder):
+        raise UpdateError("Invalid update package: Splitter folder not found")
+    return splitter_folder
+
+
+def write_update_script(updates_dir, splitter_folder, current_dir):
+    # A batch file that waits for the app to exit, copies the new files over
+    # it and starts it again
+    batch_script = os.path.join(updates_dir, "update.bat")
+    with open(batch_script, "w") as f:
+        f.write("@echo off\n")
+        f.write("timeout /t 1 /nobreak >nul\n")  # Wait for the app to close
+
+        # Copy new files
+        f.write(f'xcopy /s /y "{splitter_folder}\\*" "{current_dir}\\"\n')
+
+        # Clean up
+        f.write(f'rmdir /s /q "{updates_dir}"\n')
+
+        # Start the updated application
+        f.write(f'start "" "{current_dir}\\Splitter.exe"\n')
+
+        # Delete the batch file itself
+        f.write('(goto) 2>nul & del "%~f0"')
+    return batch_script
+
+
+def prepare_update(
+    url,
+    sha256,
+    current_dir,
+    updates_dir=UPDATES_DIR,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+):
+    # Download, verify and unpack an update. The zip is named after its
+    # checksum, so only a partial download of the same release is resumed.
+    os.makedirs(updates_dir, exist_ok=True)
+    update_zip = os.path.join(updates_dir, f"update-{sha256[:16]}.zip")
+    for name in os.listdir(updates_dir):
+        if name.endswith(".part") and name != os.path.basename(update_zip) + ".part":
+            os.remove(os.path.join(updates_dir, name))
+
+    download_file(url, update_zip, sha256, progress, is_cancelled)
+    splitter_folder = extract_update(update_zip, updates_dir)
+    script = write_update_script(
+        updates_dir, os.path.abspath(splitter_folder), current_dir
+    )
+    return {"ok": True, "update": os.path.abspath(update_zip), "script": script}
+
+
+# Delta updates. Each release also publishes manifest.json, the SHA-256 and
+# size of every file in the Splitter folder (written by setup.py), with its
+# own checksum like the zip's. Files that differ from the installed ones are
+# read straight out of the release zip on the server: the zip's central
+# directory and the changed members are fetched with HTTP Range requests, so
+# nothing else is downloaded. The manifest is installed with the app; files
+# the installed manifest lists and the new one doesn't are removed. Any
+# failure falls back to the full zip.
+
+MANIFEST_NAME = "manifest.json"
+
+# Above this share of the full zip, a delta is not worth the extra requests
+DELTA_MAX_RATIO = 0.6
+
+# Bytes fetched per Range request when reading the remote zip
+REMOTE_BLOCK_SIZE = 1024 * 1024
+
+
+def release_manifest(release_info):
+    # The manifest's URL and published SHA-256, or None if the release has
+    # no manifest or no checksum for it (the full zip is used then)
+    if not any(
+        asset["name"] == MANIFEST_NAME for asset in release_info.get("assets", [])
+    ):
+        return None
+    try:
+        return release_asset(release_info, MANIFEST_NAME)
+    except UpdateError:
+        return None
+
+
+def fetch_manifest(url, sha256, session):
+    # The manifest's bytes and contents, once they match the published SHA-256
+    response = session.get(url, timeout=DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    if hashlib.sha256(response.content).hexdigest() != sha256:
+        raise UpdateError("The update manifest does not match its SHA-256.")
+    return response.content, json.loads(response.content)
+
+
+class RemoteFile:
+    # A read-only, seekable file over HTTP Range requests, enough for
+    # zipfile.ZipFile. Reads are served from blocks of REMOTE_BLOCK_SIZE.
+    def __init__(self, url, session):
+        self.url = url
+        self.session = session
+        self.position = 0
+        self.block_start = 0
+        self.block = b""
+        self.bytes_fetched = 0
+
+        with session.get(
+            url, headers={"Range": "bytes=0-0"}, timeout=DOWNLOAD_TIMEOUT
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise UpdateError("The server does not support range requests.")
+            self.size = int(response.headers["Content-Range"].rsplit("/", 1)[1])
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.position
+
+    def seek(self, offset, whence=os.SEEK_SET):
+        if whence == os.SEEK_CUR:
+            offset += self.position
+        elif whence == os.SEEK_END:
+            offset += self.size
+        self.position = max(0, offset)
+        return self.position
+
+    def _fetch(self, start, length):
+        end = min(self.size, start + max(length, REMOTE_BLOCK_SIZE)) - 1
+        with self.session.get(
+            self.url,
+            headers={"Range": f"bytes={start}-{end}"},
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT,
+        ) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise UpdateError("The server does not support range requests.")
+            # Some servers send everything from `start` on; stop at `end`
+            self.block = response.raw.read(end - start + 1, decode_content=True)
+        self.block_start = start
+        self.bytes_fetched += len(self.block)
+
+    def read(self, size=-1):
+        remaining = self.size - self.position
+        size = remaining if size is None or size < 0 else min(size, remaining)
+        parts = []
+        while size > 0:
+            offset = self.position - self.block_start
+            if not 0 <= offset < len(self.block):
+                self._fetch(self.position, size)
+                offset = 0
+            part = self.block[offset : offset + size]
+            parts.append(part)
+            self.position += len(part)
+            size -= len(part)
+        return b"".join(parts)
+
+
+def changed_files(manifest, install_dir):
+    # Manifest entries whose installed copy is missing or different
+    changed = []
+    for path, entry in manifest["files"].items():
+        local_path = os.path.join(install_dir, *path.split("/"))
+        try:
+            if os.path.getsize(local_path) == entry["size"]:
+                if file_sha256(local_path) == entry["sha256"]:
+                    continue
+        except OSError:
+            pass
+        changed.append(path)
+    return changed
+
+
+def removed_files(manifest, install_dir):
+    # Files the installed manifest lists that the new one doesn't. Without an
+    # installed manifest (releases before it was installed) nothing is
+    # removed, so files the app didn't install are never touched.
+    try:
+        with open(os.path.join(install_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            installed = json.load(f)["files"]
+    except (OSError, ValueError, KeyError):
+        return []
+    return sorted(
+        path
+        for path in installed
+        if path not in manifest["files"]
+        and os.path.exists(os.path.join(install_dir, *path.split("/")))
+    )
+
+
+def write_delta_script(updates_dir, staged_dir, backup_dir, current_dir, removed=()):
+    # Like write_update_script, but the staged tree holds only the changed
+    # files, and a failed copy restores the previous versions. Files the
+    # release no longer has are deleted once the copy succeeded.
+    batch_script = os.path.join(updates_dir, "update.bat")
+    with open(batch_script, "w") as f:
+        f.write("@echo off\n")
+        f.write("timeout /t 1 /nobreak >nul\n")  # Wait for the app to close
+
+        # Copy the changed files; roll back if any copy fails
+        f.write(f'xcopy /s /y "{staged_dir}\\*" "{current_dir}\\"\n')
+        f.write("if errorlevel 1 (\n")
+        f.write(f'  xcopy /s /y "{backup_dir}\\*" "{current_dir}\\"\n')
+        if removed:
+            f.write(") else (\n")
+            for path in removed:
+                local_path = os.path.join(current_dir, *path.split("/"))
+                f.write(f'  del /f /q "{local_path}"\n')
+        f.write(")\n")
+
+        # Clean up
+        f.write(f'rmdir /s /q "{updates_dir}"\n')
+
+        # Start the updated application
+        f.write(f'start "" "{current_dir}\\Splitter.exe"\n')
+
+        # Delete the batch file itself
+        f.write('(goto) 2>nul & del "%~f0"')
+    return batch_script
+
+
+def prepare_delta_update(
+    url,
+    manifest_url,
+    manifest_sha256,
+    current_dir,
+    updates_dir=UPDATES_DIR,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+    session=None,
+):
+    # Stage only the files that changed; raises UpdateError when a delta is
+    # not possible or not worth it
+    import requests
+
+    session = session or requests.Session()
+    manifest_data, manifest = fetch_manifest(manifest_url, manifest_sha256, session)
+
+    changed = changed_files(manifest, current_dir)
+    removed = removed_files(manifest, current_dir)
+    if not changed and not removed:
+        raise UpdateError("The installed files already match the release.")
+
+    remote = RemoteFile(url, session)
+    with zipfile.ZipFile(remote) as zip_ref:
+        members = [zip_ref.getinfo(f"Splitter/{path}") for path in changed]
+        total = sum(info.compress_size for info in members)
+        if total > remote.size * DELTA_MAX_RATIO:
+            raise UpdateError("Most files changed; downloading the full update.")
+
+        # Stage everything and verify it before anything is replaced
+        staged_dir = os.path.join(updates_dir, "staged")
+        backup_dir = os.path.join(updates_dir, "backup")
+        for folder in (staged_dir, backup_dir):
+            if os.path.exists(folder):
+                shutil.rmtree(folder)
+
+        done = 0
+        for path, info in zip(changed, members):
+            if is_cancelled():
+                raise JobCancelled()
+            staged_path = os.path.join(staged_dir, *path.split("/"))
+            os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+            with zip_ref.open(info) as source, open(staged_path, "wb") as target:
+                shutil.copyfileobj(source, target, DOWNLOAD_CHUNK_SIZE)
+            if file_sha256(staged_path) != manifest["files"][path]["sha256"]:
+                raise UpdateError(f"Changed file {path} does not match the manifest.")
+
+            # Keep the current version for rolling back
+            local_path = os.path.join(current_dir, *path.split("/"))
+            if os.path.exists(local_path):
+                backup_path = os.path.join(backup_dir, *path.split("/"))
+                os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+                shutil.copy2(local_path, backup_path)
+
+            done += info.compress_size
+            progress(done, total)
+
+    # The new manifest is installed with the files; the old one is kept for
+    # rolling back
+    os.makedirs(staged_dir, exist_ok=True)
+    with open(os.path.join(staged_dir, MANIFEST_NAME), "wb") as f:
+        f.write(manifest_data)
+    local_manifest = os.path.join(current_dir, MANIFEST_NAME)
+    if os.path.exists(local_manifest):
+        os.makedirs(backup_dir, exist_ok=True)
+        shutil.copy2(local_manifest, os.path.join(backup_dir, MANIFEST_NAME))
+
+    script = write_delta_script(
+        updates_dir,
+        os.path.abspath(staged_dir),
+        os.path.abspath(backup_dir),
+        current_dir,
+        removed,
+    )
+    return {
+        "ok": True,
+        "delta": True,
+        "files": len(changed),
+        "files_removed": len(removed),
+        "bytes_downloaded": remote.bytes_fetched,
+        "script": script,
+    }
+
+
+def install_update(
+    url,
+    sha256,
+    manifest_url,
+    manifest_sha256,
+    current_dir,
+    updates_dir=UPDATES_DIR,
+    progress=_no_progress,
+    is_cancelled=_never_cancelled,
+):
+    # Delta update when the release has a manifest, else (or if the delta
+    # fails for any reason) the full zip
+    if manifest_url:
+        os.makedirs(updates_dir, exist_ok=True)
+        try:
+            return prepare_delta_update(
+                url,
+                manifest_url,
+                manifest_sha256,
+                current_dir,
+                updates_dir,
+                progress,
+                is_cancelled,
+            )
+        except JobCancelled:
+            raise
+        except Exception as e:
+            metrics.logger.info(
+                "delta update not applied", extra={"job": {"reason": str(e)}}
+            )
+    return prepare_update(url, sha256, current_dir, updates_dir, progress, is_cancelled)
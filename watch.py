@@ -0,0 +1,442 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from batch import batch_output_path, default_workers
+from core import JobError, extract_pages, extract_slides, merge_pdfs
+from ranges import range_label
+
+# Hot folders: watches directories and runs a rule on every file dropped into
+# them, without the window. Rules come from a JSON file:
+#
+#   {"folders": [
+#     {"path": "scans/inbox", "action": "extract", "pages": "1-2",
+#      "output": "scans/covers"},
+#     {"path": "scans/daily", "action": "merge", "every": "hour",
+#      "output": "scans/archive"},
+#     {"path": "decks", "action": "slides", "slides": "1-3", "output": "handouts"}
+#   ]}
+#
+# Relative paths are taken from the rules file's folder. A file is picked up
+# once its size and modification time have not changed for "settle" seconds,
+# so scanners writing over a share are never read half-way. Inputs are moved
+# to "processed" (or "failed") under the watched folder afterwards, and
+# results appear in the output folder under their final name in one rename.
+#
+# Linux uses inotify to notice new files at once; elsewhere, on network
+# mounts (inotify does not see writes from other machines) and with --poll,
+# the folders are scanned every POLL_INTERVAL seconds.
+
+ACTIONS = ("extract", "slides", "merge")
+DEFAULT_PATTERNS = {"extract": "*.pdf", "slides": "*.pptx", "merge": "*.pdf"}
+MERGE_PERIODS = {"hour": 3600, "day": 86400}
+
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL = 2.0
+
+# With inotify, folders are still rescanned this often in case events were
+# missed (queue overflow, files moved in before the watch started)
+RESCAN_INTERVAL = 60.0
+
+# Jobs waiting for or running on a worker; ready files beyond this stay in
+# the folder until a slot frees up
+QUEUE_SIZE = 16
+
+PROCESSED_DIR = "processed"
+FAILED_DIR = "failed"
+
+
+def load_rules(rules_file):
+    try:
+        with open(rules_file, encoding="utf-8") as f:
+            config = json.load(f)
+    except OSError as e:
+        raise JobError(f"Cannot read {rules_file}: {e.strerror}")
+    except ValueError as e:
+        raise JobError(f"{rules_file} is not valid JSON: {e}")
+
+    base_dir = os.path.dirname(os.path.abspath(rules_file))
+    rules = []
+    for number, rule in enumerate(config.get("folders", []), 1):
+        action = rule.get("action")
+        if action not in ACTIONS:
+            raise JobError(
+                f"Folder {number}: action must be one of {', '.join(ACTIONS)}."
+            )
+        option = {"extract": "pages", "slides": "slides", "merge": "every"}[action]
+        if not rule.get(option):
+            raise JobError(f"Folder {number}: {action} needs {option!r}.")
+        if "path" not in rule:
+            raise JobError(f"Folder {number}: 'path' is missing.")
+
+        path = os.path.join(base_dir, rule["path"])
+        output = os.path.join(
+            base_dir, rule.get("output", os.path.join(path, "output"))
+        )
+        if os.path.abspath(output) == os.path.abspath(path):
+            # Results would be picked up again as new input
+            raise JobError(f"Folder {number}: output must not be the watched folder.")
+        rule = dict(
+            rule,
+            path=path,
+            output=output,
+            pattern=rule.get("pattern", DEFAULT_PATTERNS[action]),
+            settle=float(rule.get("settle", SETTLE_SECONDS)),
+        )
+        if action == "merge":
+            every = MERGE_PERIODS.get(rule["every"], rule["every"])
+            if not isinstance(every, (int, float)) or every <= 0:
+                raise JobError(
+                    f"Folder {number}: 'every' must be hour, day or seconds."
+                )
+            rule["every"] = every
+        rules.append(rule)
+
+    if not rules:
+        raise JobError(f"{rules_file} does not list any folders.")
+    return rules
+
+
+def _output_name(rule, input_files, window_start=None):
+    if rule["action"] == "extract":
+        return os.path.basename(batch_output_path(input_files[0], rule["pages"]))
+    if rule["action"] == "slides":
+        base_name = os.path.splitext(os.path.basename(input_files[0]))[0]
+        label = range_label(rule["slides"]).replace("-", "_")
+        return f"{base_name}_slides_{label}.pptx"
+    stamp = time.strftime("%Y%m%d-%H%M", time.localtime(window_start))
+    return f"merged_{stamp}.pdf"
+
+
+def _run_job(rule, input_files, output_file):
+    # Runs in a worker process; never raises. Outputs are renamed into place
+    # once complete (see sinks).
+    try:
+        if rule["action"] == "extract":
+            return extract_pages(
+                input_files[0], output_file, rule["pages"], cached=False
+            )
+        elif rule["action"] == "slides":
+            return extract_slides(
+                input_files[0], output_file, rule["slides"], cached=False
+            )
+        if len(input_files) == 1:
+            # A window with a single file: its pages are copied as they are
+            result = extract_pages(input_files[0], output_file, "1-", cached=False)
+            result["operation"] = "merge"
+            return result
+        return merge_pdfs(input_files, output_file)
+    except Exception as e:
+        return {
+            "ok": False,
+            "operation": rule["action"],
+            "inputs": [os.path.abspath(path) for path in input_files],
+            "error": str(e),
+        }
+
+
+def _archive_path(archive_dir, name):
+    # A name dropped in again gets a counter so the earlier input is kept:
+    # scan.pdf, scan_2.pdf, scan_3.pdf...
+    base_name, extension = os.path.splitext(name)
+    path = os.path.join(archive_dir, name)
+    number = 1
+    while os.path.lexists(path):
+        number += 1
+        path = os.path.join(archive_dir, f"{base_name}_{number}{extension}")
+    return path
+
+
+def _ignore_interrupts():
+    # Ctrl+C reaches the whole process group; only the parent handles it and
+    # lets running jobs finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class InotifyWatcher:
+    # Wakes up when a file is finished or moved into a watched folder
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_TO = 0x00000080
+    IN_Q_OVERFLOW = 0x00004000
+    EVENT_HEADER = struct.Struct("iIII")
+
+    def __init__(self, folders):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.folders = {}
+        try:
+            for folder in folders:
+                wd = libc.inotify_add_watch(
+                    self.fd,
+                    os.fsencode(folder),
+                    self.IN_CLOSE_WRITE | self.IN_MOVED_TO,
+                )
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+                self.folders[wd] = folder
+        except OSError:
+            self.close()
+            raise
+
+    def wait(self, timeout):
+        # Folders with new activity; all of them after a queue overflow
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size + length
+            if mask & self.IN_Q_OVERFLOW:
+                changed.update(self.folders.values())
+            elif wd in self.folders:
+                changed.add(self.folders[wd])
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    def wait(self, timeout):
+        # Folders are rescanned on their POLL_INTERVAL schedule
+        time.sleep(timeout)
+        return set()
+
+    def close(self):
+        pass
+
+
+def create_watcher(folders, poll=False):
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(folders), RESCAN_INTERVAL
+        except (OSError, AttributeError):
+            pass  # No inotify (old libc, watch limit reached): poll instead
+    return PollingWatcher(), POLL_INTERVAL
+
+
+class WatchedFolder:
+    def __init__(self, rule):
+        self.rule = rule
+        self.pending = {}  # path -> ((size, mtime), monotonic time first seen)
+        self.claimed = set()  # handed to a job, not yet moved away
+        self.batch = []  # merge rules: ready files of the current window
+        self.window_start = None
+        self.next_scan = 0.0
+
+    def needs_scan(self, now):
+        # Settling files are checked on every pass; a merge window that has
+        # closed is flushed even when nothing new arrived
+        if self.pending or now >= self.next_scan:
+            return True
+        return bool(self.batch) and time.time() >= self.window_end()
+
+    def window_end(self):
+        return self.window_start + self.rule["every"]
+
+    def scan(self, now):
+        # Files whose size and modification time have settled
+        ready = []
+        seen = set()
+        for entry in os.scandir(self.rule["path"]):
+            name = entry.name
+            if name.startswith(".") or not fnmatch.fnmatch(name, self.rule["pattern"]):
+                continue
+            if entry.path in self.claimed or not entry.is_file():
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue  # Moved away in the meantime
+            signature = (stat.st_size, stat.st_mtime_ns)
+            seen.add(entry.path)
+
+            previous = self.pending.get(entry.path)
+            if previous is None or previous[0] != signature:
+                self.pending[entry.path] = (signature, now)
+            elif now - previous[1] >= self.rule["settle"]:
+                ready.append(entry.path)
+
+        for path in set(self.pending) - seen:
+            del self.pending[path]
+        return sorted(ready)
+
+    def claim(self, path):
+        self.pending.pop(path, None)
+        self.claimed.add(path)
+
+    def archive(self, input_files, ok):
+        # Same folder tree, so the move is a rename
+        archive_dir = os.path.join(
+            self.rule["path"], PROCESSED_DIR if ok else FAILED_DIR
+        )
+        os.makedirs(archive_dir, exist_ok=True)
+        for path in input_files:
+            try:
+                os.replace(path, _archive_path(archive_dir, os.path.basename(path)))
+            except OSError:
+                pass
+            self.claimed.discard(path)
+
+
+class HotFolders:
+    def __init__(self, rules, workers=None, poll=False, on_result=None):
+        self.folders = {rule["path"]: WatchedFolder(rule) for rule in rules}
+        self.workers = workers or default_workers()
+        self.poll = poll
+        self.on_result = on_result
+        self.slots = threading.BoundedSemaphore(QUEUE_SIZE)
+        # Reentrant: a job that is already done runs its callback on submit
+        self.lock = threading.RLock()
+        self.stopping = threading.Event()
+        self.executor = None
+        self.succeeded = 0
+        self.failed = 0
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def _create_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_ignore_interrupts
+        )
+
+    def _submit(self, folder, input_files, output_file):
+        # Takes over the slot acquired by the caller
+        for path in input_files:
+            folder.claim(path)
+        job = (_run_job, folder.rule, input_files, output_file)
+        try:
+            try:
+                future = self.executor.submit(*job)
+            except BrokenProcessPool:
+                # A worker died and took the pool down with it; the jobs it
+                # was running have failed, later ones get a fresh pool
+                self.executor.shutdown(wait=False)
+                self.executor = self._create_executor()
+                future = self.executor.submit(*job)
+        except Exception as e:
+            self._record(folder, input_files, self._error(folder, e))
+            return
+        future.add_done_callback(
+            lambda future: self._finished(folder, input_files, future)
+        )
+
+    def _error(self, folder, error):
+        return {"ok": False, "operation": folder.rule["action"], "error": str(error)}
+
+    def _finished(self, folder, input_files, future):
+        try:
+            result = future.result()
+        except Exception as e:  # The worker process died
+            result = self._error(folder, e)
+        self._record(folder, input_files, result)
+
+    def _record(self, folder, input_files, result):
+        try:
+            with self.lock:
+                folder.archive(input_files, result["ok"])
+                if result["ok"]:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+                if self.on_result:
+                    self.on_result(result)
+        finally:
+            self.slots.release()
+
+    def _dispatch(self, folder, ready, now):
+        rule = folder.rule
+        if rule["action"] != "merge":
+            for path in ready:
+                if not self.slots.acquire(blocking=False):
+                    return  # Queue full; picked up again on a later scan
+                output_file = os.path.join(rule["output"], _output_name(rule, [path]))
+                self._submit(folder, [path], output_file)
+            return
+
+        # Merge everything that arrived in a clock-aligned window
+        wall_time = time.time()
+        if folder.window_start is None:
+            folder.window_start = wall_time - wall_time % rule["every"]
+        for path in ready:
+            folder.claim(path)
+            folder.batch.append(path)
+        if wall_time < folder.window_end():
+            return
+        if folder.batch and self.slots.acquire(blocking=False):
+            input_files = sorted(folder.batch)
+            name = _output_name(rule, input_files, folder.window_start)
+            self._submit(folder, input_files, os.path.join(rule["output"], name))
+            folder.batch = []
+        if not folder.batch:
+            folder.window_start = None
+
+    def run(self):
+        for folder in self.folders.values():
+            os.makedirs(folder.rule["path"], exist_ok=True)
+            os.makedirs(folder.rule["output"], exist_ok=True)
+
+        started = time.perf_counter()
+        watcher, interval = create_watcher(list(self.folders), self.poll)
+        self.executor = self._create_executor()
+        try:
+            changed = set(self.folders)
+            while not self.stopping.is_set():
+                now = time.monotonic()
+                with self.lock:
+                    for path, folder in self.folders.items():
+                        if path in changed or folder.needs_scan(now):
+                            folder.next_scan = now + interval
+                            self._dispatch(folder, folder.scan(now), now)
+
+                # Wake up often enough to notice settled files and stop requests
+                busy = any(folder.pending for folder in self.folders.values())
+                changed = watcher.wait(0.5 if busy else 1.0)
+        finally:
+            watcher.close()
+            # Jobs already handed out finish; unmerged files stay for next time
+            self.executor.shutdown(wait=True)
+
+        return {
+            "ok": self.failed == 0,
+            "operation": "watch",
+            "folders": len(self.folders),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "watcher": "inotify" if isinstance(watcher, InotifyWatcher) else "poll",
+            "elapsed": round(time.perf_counter() - started, 6),
+        }
+
+
+def watch_folders(rules, workers=None, poll=False, on_result=None):
+    # Runs until SIGINT or SIGTERM, then returns a summary
+    hot_folders = HotFolders(rules, workers, poll, on_result)
+    handlers = {
+        signum: signal.signal(signum, hot_folders.stop)
+        for signum in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        return hot_folders.run()
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)